@@ -0,0 +1,105 @@
+"""
+Extraction Benchmark
+====================
+Compares the legacy iterrows() extraction with the columnar engine in
+esg_extraction on a synthetic 'Project 1' style sheet, and checks that both
+produce the same per-resource totals.
+
+Usage: python benchmark_extraction.py [rows]
+"""
+
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from esg_extraction import (DECIMAL_PATTERN, INTEGER_PATTERN, PORTAL_RESOURCES,
+                            SUNSURE_RESOURCES, extract_resource_monthly)
+
+DESCRIPTIONS = ['Water supply', 'Diesel', 'Fuel - generator', 'Electricity (grid)', 'Cement',
+                'Concrete', 'Steel', 'Metal: scrap metal', 'Sand', 'Bricks', None]
+UNITS = ['Litre', 'Liters', 'ltr', 'Tons', 'Bags', 'kWh']
+
+
+def make_sheet(n_rows, seed=42):
+    """Build a sheet with descriptions in column 2 and mixed monthly cells in columns 5-16"""
+    rng = np.random.default_rng(seed)
+    data = {
+        0: [None] * n_rows,
+        1: np.arange(n_rows),
+        2: [DESCRIPTIONS[i] for i in rng.integers(0, len(DESCRIPTIONS), n_rows)],
+        3: [None] * n_rows,
+        4: [UNITS[i] for i in rng.integers(0, len(UNITS), n_rows)],
+    }
+    for col in range(5, 17):
+        cells = []
+        for kind, value, unit in zip(rng.integers(0, 4, n_rows), rng.random(n_rows) * 10000, rng.integers(0, len(UNITS), n_rows)):
+            if kind == 0:
+                cells.append(round(float(value), 1))
+            elif kind == 1:
+                cells.append(f"{value:.1f} {UNITS[unit]}")
+            elif kind == 2:
+                cells.append(int(value))
+            else:
+                cells.append(np.nan)
+        data[col] = pd.Series(cells, dtype=object)
+    return pd.DataFrame(data)
+
+
+def legacy_row_values(row, pattern):
+    """Per-cell conversion as done by the original extract_monthly_values"""
+    values = []
+    for i in range(5, 17):
+        val = row.iloc[i] if i < len(row) else 0
+        if pd.isna(val):
+            values.append(0)
+        elif isinstance(val, (float, int)):
+            values.append(val)
+        elif isinstance(val, str):
+            numbers = re.findall(pattern, val)
+            values.append(float(numbers[0]) if numbers else 0)
+        else:
+            values.append(0)
+    return values
+
+
+def legacy_extract(sheet, resources, pattern):
+    """Original iterrows() loop with first-match-wins classification"""
+    totals = {name: 0 for name, _ in resources}
+    for _, row in sheet.iterrows():
+        desc_str = str(row.iloc[2]).lower()
+        for name, keywords in resources:
+            if any(keyword in desc_str for keyword in keywords):
+                totals[name] += sum(legacy_row_values(row, pattern))
+                break
+    return totals
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    sheet = make_sheet(n_rows)
+    print(f"Synthetic sheet: {n_rows:,} rows x {sheet.shape[1]} columns")
+
+    for label, resources, pattern in [('Sunsure', SUNSURE_RESOURCES, DECIMAL_PATTERN),
+                                      ('Portal', PORTAL_RESOURCES, INTEGER_PATTERN)]:
+        legacy, legacy_time = timed(legacy_extract, sheet, resources, pattern)
+        monthly, engine_time = timed(extract_resource_monthly, sheet, resources, pattern)
+        engine = monthly.sum(axis=1)
+
+        for name, _ in resources:
+            assert np.isclose(legacy[name], engine[name]), f"{label} {name}: {legacy[name]} != {engine[name]}"
+
+        print(f"{label:8s} legacy {legacy_time * 1000:9.1f} ms | columnar {engine_time * 1000:7.1f} ms "
+              f"| speedup {legacy_time / engine_time:6.1f}x | totals match")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""
+ESG Benchmark Suite
+===================
+Times the Sunsure pipeline stage by stage (parse, extract, aggregate,
+export) on synthetic 'Project 1' workbooks, and appends the results to a
+JSON lines file so runs can be compared for regressions.
+
+Generated workbooks follow the template layout: description in column 2,
+unit in column 4 and January-December in columns 5-16, with a mix of
+numbers, "8500 Litre" style strings and blank cells. They are cached on disk
+by (rows, seed) so repeated runs parse identical files.
+
+Usage:
+    python benchmark_suite.py                      # quick scenarios
+    python benchmark_suite.py --full               # 1-1,000 sites, 100-100k rows
+    python benchmark_suite.py --sites 1 100 --rows 1000 100000 --repeat 3
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+from esg_extraction import MONTHS, read_main_sheet, sunsure_site_kpis
+from esg_portfolio import PortfolioTensor
+from esg_reports import build_exports
+
+DEFAULT_SCENARIOS = [(1, 100), (1, 10000), (10, 1000), (100, 100)]
+FULL_SCENARIOS = [(1, 100), (1, 1000), (1, 10000), (1, 100000), (10, 1000), (100, 1000), (1000, 100)]
+STAGES = ['parse', 'extract', 'aggregate', 'export']
+
+DEFAULT_RESULTS = 'benchmark_results.jsonl'
+DEFAULT_WORKBOOK_DIR = os.path.join(tempfile.gettempdir(), 'esg_benchmark_workbooks')
+
+# Distinct workbooks per scenario; larger portfolios reuse them under different site names
+DISTINCT_WORKBOOKS = 10
+
+# (description, unit, typical monthly value) rows seen in site templates; None rows are section breaks
+TEMPLATE_ROWS = [
+    ('Water consumption - domestic', 'Litre', 20000), ('Water for module cleaning', 'KL', 150),
+    ('Diesel consumed in DG sets', 'Litre', 900), ('Fuel - site vehicles', 'Litre', 400),
+    ('Electricity purchased from grid', 'kWh', 12000), ('Cement used', 'kg', 5000),
+    ('Concrete', 'Tons', 40), ('Steel / structural metal', 'Tons', 12),
+    ('Sand', 'Tons', 30), ('Hazardous waste', 'kg', 50), ('Manpower on site', 'Nos', 120),
+    ('Remarks', None, None), (None, None, None),
+]
+STATES = ['Solapur', 'Rajasthan', 'Gujarat', 'Augasi', 'Karnataka', 'Tamil Nadu']
+TECHNOLOGIES = ['Solar', 'Wind', 'Hybrid']
+
+
+def site_file_name(index, seed=0):
+    """Template-style file name carrying state, capacity and technology hints"""
+    rng = np.random.default_rng(seed * 100003 + index)
+    capacity = int(rng.integers(5, 40)) * 10
+    return (f"GHG_Data_{index:04d}_{capacity}MW-{TECHNOLOGIES[index % len(TECHNOLOGIES)]}"
+            f"-{STATES[index % len(STATES)]}.xlsx")
+
+
+def make_workbook(n_rows, seed=0):
+    """Bytes of a synthetic site workbook with a 'Project 1' sheet of n_rows data rows"""
+    rng = np.random.default_rng(seed)
+    templates = rng.integers(0, len(TEMPLATE_ROWS), n_rows)
+    kinds = rng.integers(0, 10, (n_rows, len(MONTHS)))
+    scale = rng.random((n_rows, len(MONTHS))) * 1.5 + 0.25
+
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'in_memory': True})
+    summary = workbook.add_worksheet('Summary')
+    summary.write_row(0, 0, ['Site GHG data', 'Generated for benchmarking'])
+    sheet = workbook.add_worksheet('Project 1')
+    sheet.write_row(0, 0, ['S.No', 'Category', 'Description', 'Scope', 'Unit'] + MONTHS)
+
+    for i in range(n_rows):
+        description, unit, typical = TEMPLATE_ROWS[templates[i]]
+        row = [i + 1, 'Environment', description, None, unit]
+        for m in range(len(MONTHS)):
+            kind = kinds[i, m]
+            if typical is None or kind >= 8:
+                row.append(None)
+            elif kind >= 5:
+                # Numbers typed with their unit, e.g. "8500 Litre"
+                row.append(f"{round(typical * scale[i, m])} {unit}")
+            elif kind == 4:
+                row.append(round(typical * scale[i, m], 1))
+            else:
+                row.append(int(typical * scale[i, m]))
+        sheet.write_row(i + 1, 0, row)
+
+    workbook.close()
+    return output.getvalue()
+
+
+def cached_workbook(n_rows, seed, workbook_dir):
+    """Generated workbook bytes, reused from workbook_dir when already built"""
+    path = os.path.join(workbook_dir, f"project1_{n_rows}rows_seed{seed}.xlsx")
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return f.read()
+    data = make_workbook(n_rows, seed)
+    os.makedirs(workbook_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return data
+
+
+def run_scenario(n_sites, n_rows, workbook_dir=DEFAULT_WORKBOOK_DIR):
+    """Time each pipeline stage once for a portfolio of n_sites workbooks of n_rows rows"""
+    workbooks = [cached_workbook(n_rows, seed, workbook_dir) for seed in range(min(n_sites, DISTINCT_WORKBOOKS))]
+    timings = dict.fromkeys(STAGES, 0.0)
+
+    records = []
+    for i in range(n_sites):
+        file_name = site_file_name(i)
+        start = time.perf_counter()
+        sheet = read_main_sheet(io.BytesIO(workbooks[i % len(workbooks)]))
+        parsed = time.perf_counter()
+        records.append(sunsure_site_kpis(sheet, file_name, file_name[:-5]))
+        timings['parse'] += parsed - start
+        timings['extract'] += time.perf_counter() - parsed
+
+    start = time.perf_counter()
+    tensor = PortfolioTensor.from_records(records)
+    state_summary = tensor.state_summary()
+    df = tensor.to_frame()
+    timings['aggregate'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    build_exports(df, state_summary)
+    timings['export'] = time.perf_counter() - start
+
+    return timings, float(tensor.portfolio_totals()['ghg'])
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def load_results(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def previous_result(results, n_sites, n_rows):
+    for result in reversed(results):
+        if result['sites'] == n_sites and result['rows'] == n_rows:
+            return result
+    return None
+
+
+def compare(result, previous, threshold):
+    """Per-stage change against the previous run; returns (text, regressed stages)"""
+    if previous is None:
+        return "no previous run", []
+    changes, regressed = [], []
+    for stage in STAGES + ['total']:
+        before = previous['total'] if stage == 'total' else previous['stages'].get(stage)
+        after = result['total'] if stage == 'total' else result['stages'][stage]
+        if not before:
+            continue
+        change = after / before - 1
+        changes.append(f"{stage} {change:+.0%}")
+        # Sub-millisecond stages are too noisy to call regressions
+        if change > threshold and after - before > 0.001:
+            regressed.append(stage)
+    if not np.isclose(result['ghg_total'], previous['ghg_total']):
+        regressed.append('ghg_total')
+        changes.append(f"GHG total changed {previous['ghg_total']:.4f} -> {result['ghg_total']:.4f}")
+    return f"vs {previous.get('commit') or '?'} {previous['timestamp']}: " + ', '.join(changes), regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stage-by-stage benchmark of the Sunsure ESG pipeline")
+    parser.add_argument('--sites', type=int, nargs='+', help="Portfolio sizes (number of site workbooks)")
+    parser.add_argument('--rows', type=int, nargs='+', help="Data rows per workbook")
+    parser.add_argument('--full', action='store_true', help="Run the full 1-1,000 sites / 100-100k rows matrix")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per scenario; the fastest time per stage is kept")
+    parser.add_argument('--results', default=DEFAULT_RESULTS, help=f"JSON lines results file (default: {DEFAULT_RESULTS})")
+    parser.add_argument('--workbook-dir', default=DEFAULT_WORKBOOK_DIR, help="Cache of generated workbooks")
+    parser.add_argument('--label', help="Free-text note stored with the results, e.g. the change being measured")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Slowdown ratio reported as a regression (default: 0.2 = 20%%)")
+    parser.add_argument('--no-save', action='store_true', help="Do not append to the results file")
+    args = parser.parse_args(argv)
+
+    if args.sites or args.rows:
+        scenarios = [(sites, rows) for sites in args.sites or [1] for rows in args.rows or [1000]]
+    else:
+        scenarios = FULL_SCENARIOS if args.full else DEFAULT_SCENARIOS
+
+    history = load_results(args.results)
+    environment = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'label': args.label,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+    new_results, regressions = [], 0
+    print(f"{'sites':>6s} {'rows':>8s} " + ' '.join(f"{stage:>10s}" for stage in STAGES) + f" {'total':>10s}")
+    for n_sites, n_rows in scenarios:
+        best, ghg_total = None, None
+        for _ in range(max(1, args.repeat)):
+            timings, ghg_total = run_scenario(n_sites, n_rows, args.workbook_dir)
+            best = timings if best is None else {stage: min(best[stage], timings[stage]) for stage in STAGES}
+
+        result = dict(environment, sites=n_sites, rows=n_rows, stages=best,
+                      total=sum(best.values()), ghg_total=ghg_total)
+        new_results.append(result)
+        print(f"{n_sites:6d} {n_rows:8d} " + ' '.join(f"{best[stage]:9.3f}s" for stage in STAGES)
+              + f" {result['total']:9.3f}s")
+
+        text, regressed = compare(result, previous_result(history, n_sites, n_rows), args.threshold)
+        print(f"{'':16s}{text}" + (f"  << REGRESSION: {', '.join(regressed)}" if regressed else ''))
+        regressions += bool(regressed)
+
+    if not args.no_save:
+        with open(args.results, 'a') as f:
+            for result in new_results:
+                f.write(json.dumps(result) + '\n')
+        print(f"Results appended to {args.results}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
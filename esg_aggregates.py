@@ -0,0 +1,148 @@
+"""
+ESG Running Aggregates
+======================
+Portfolio totals and per-group sums (by state, technology and site
+category) kept up to date one site at a time. Adding, replacing or removing
+a site adjusts the totals by that site's contribution only, so the headline
+numbers, intensities and state summary are read in time independent of how
+many sites are loaded.
+This module does not import Streamlit.
+"""
+
+import numpy as np
+import pandas as pd
+
+from esg_portfolio import RESOURCES, SCOPES
+
+# Summed per site: a site count, capacity (the intensity denominator) and the numerators
+FIELDS = ('sites', 'capacity', *RESOURCES, *(f'scope{scope}' for scope in SCOPES), 'ghg')
+FIELD_INDEX = {field: i for i, field in enumerate(FIELDS)}
+DIMENSIONS = ('state', 'technology', 'category')
+
+UNASSIGNED = 'Unassigned'
+
+
+def _per_mw(value, capacity):
+    return value / capacity if capacity > 0 else float('nan')
+
+
+class RunningAggregates:
+    def __init__(self):
+        # site -> (group key per dimension, contribution vector over FIELDS)
+        self.site_rows = {}
+        self.total = np.zeros(len(FIELDS))
+        self.groups = {dimension: {} for dimension in DIMENSIONS}
+
+    def __len__(self):
+        return len(self.site_rows)
+
+    def __contains__(self, site_name):
+        return site_name in self.site_rows
+
+    def set_site(self, site_name, values, state='', technology='', category=''):
+        """Add a site, or replace its earlier contribution; values maps FIELDS (bar 'sites') to numbers"""
+        self.remove_site(site_name)
+        row = np.array([1.0] + [float(values.get(field, 0.0)) for field in FIELDS[1:]])
+        keys = (state or '', technology or '', category or '')
+        self.site_rows[site_name] = (keys, row)
+        self.total += row
+        for dimension, key in zip(DIMENSIONS, keys):
+            group = self.groups[dimension]
+            if key in group:
+                group[key] += row
+            else:
+                group[key] = row.copy()
+
+    def remove_site(self, site_name):
+        """Take a site's contribution back out; False when it was not included"""
+        entry = self.site_rows.pop(site_name, None)
+        if entry is None:
+            return False
+        keys, row = entry
+        self.total -= row
+        for dimension, key in zip(DIMENSIONS, keys):
+            group = self.groups[dimension]
+            group[key] -= row
+            # Drop emptied groups rather than keep float residue around
+            if group[key][0] < 0.5:
+                del group[key]
+        if not self.site_rows:
+            self.total[:] = 0.0
+        return True
+
+    def set_record(self, record, category=''):
+        """Add or replace a site from its SunsureKPIRecord"""
+        values = {'capacity': record.capacity, 'ghg': record.ghg_total()}
+        values.update(zip(RESOURCES, record.monthly.sum(axis=1).tolist()))
+        values.update((f'scope{scope}', value) for scope, value in zip(SCOPES, record.scopes.tolist()))
+        self.set_site(record.site_name, values, record.state, record.technology, category)
+
+    def set_tensor_sites(self, tensor, site_names=None, categories=None):
+        """Add or replace the given sites (all by default) from a PortfolioTensor.
+
+        categories maps a site name to its site category.
+        """
+        names = list(tensor.site_names) if site_names is None else [n for n in site_names if n in tensor.site_index]
+        if not names:
+            return
+        idx = np.array([tensor.site_index[name] for name in names], dtype=int)
+        resource_totals = tensor.resource_totals()[idx]
+        scope_totals = tensor.scope_totals()[idx]
+        states = np.asarray(tensor.state_labels, dtype=object)[tensor.state_codes[idx]]
+        technologies = np.asarray(tensor.tech_labels, dtype=object)[tensor.tech_codes[idx]]
+        categories = categories or {}
+        for i, name in enumerate(names):
+            values = {'capacity': tensor.capacity[idx[i]], 'ghg': scope_totals[i].sum()}
+            values.update({resource: resource_totals[i, r] for r, resource in enumerate(RESOURCES)})
+            values.update({f'scope{scope}': scope_totals[i, k] for k, scope in enumerate(SCOPES)})
+            self.set_site(name, values, states[i], technologies[i], categories.get(name, ''))
+
+    @classmethod
+    def from_tensor(cls, tensor, categories=None):
+        aggregates = cls()
+        aggregates.set_tensor_sites(tensor, categories=categories)
+        return aggregates
+
+    def sync(self, tensor, changed_sites, categories=None):
+        """Bring the aggregates in line with a refreshed tensor.
+
+        Sites no longer in the tensor are removed; changed sites and sites
+        not yet included are (re)read from it; unchanged sites are not touched.
+        """
+        for name in [name for name in self.site_rows if name not in tensor.site_index]:
+            self.remove_site(name)
+        changed = set(changed_sites)
+        names = [name for name in tensor.site_names if name in changed or name not in self.site_rows]
+        self.set_tensor_sites(tensor, names, categories)
+
+    # Reads: cost depends on the number of groups, not sites
+
+    def totals(self):
+        """Portfolio totals and per-MW intensities for the summary cards"""
+        totals = dict(zip(FIELDS, self.total.tolist()))
+        totals['sites'] = len(self.site_rows)
+        totals['ghg_per_mw'] = _per_mw(totals['ghg'], totals['capacity'])
+        totals['water_per_mw'] = _per_mw(totals['water'], totals['capacity'])
+        totals['diesel_per_mw'] = _per_mw(totals['diesel'], totals['capacity'])
+        return totals
+
+    def group_summary(self, dimension, label=None):
+        """One row per group: site count, capacity, water, diesel, GHG and GHG per MW"""
+        groups = sorted(self.groups[dimension].items())
+        rows = np.array([row for _, row in groups]).reshape(len(groups), len(FIELDS))
+        capacity, ghg = rows[:, FIELD_INDEX['capacity']], rows[:, FIELD_INDEX['ghg']]
+        return pd.DataFrame({
+            label or dimension.title(): [key or UNASSIGNED for key, _ in groups],
+            'Num_Sites': np.rint(rows[:, FIELD_INDEX['sites']]).astype(int),
+            'Capacity_MW': capacity,
+            'Water_Total': rows[:, FIELD_INDEX['water']],
+            'Diesel_Total': rows[:, FIELD_INDEX['diesel']],
+            'GHG_Total': ghg,
+            'GHG_per_MW': np.divide(ghg, capacity, out=np.full(len(groups), np.nan), where=capacity > 0),
+        })
+
+    def state_summary(self):
+        """State-wise totals, same columns and order as PortfolioTensor.state_summary"""
+        summary = self.group_summary('state', 'State')
+        summary['State'] = [key for key, _ in sorted(self.groups['state'].items())]
+        return summary[['State', 'Capacity_MW', 'Water_Total', 'Diesel_Total', 'GHG_Total', 'Num_Sites']]
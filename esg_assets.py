@@ -0,0 +1,82 @@
+"""
+ESG Static Assets
+=================
+Resize and recompress the dashboard images once, write them to the static
+folder Streamlit serves at app/static/, and keep the encoded payloads in
+memory. Prepared files are reused until their source image changes.
+This module does not import Streamlit.
+"""
+
+import base64
+import os
+from collections import namedtuple
+
+from PIL import Image
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+STATIC_URL = 'app/static'
+
+# name -> (source file, prepared file, max (width, height), format, quality)
+ASSET_SPECS = {
+    'background': ('homepage-flyer1.jpg', 'homepage-bg.jpg', (1600, 1600), 'JPEG', 70),
+    'logo': ('Sunsure-Energy_Logo-with-tagline.png', 'sunsure-logo.png', (640, 640), 'PNG', None),
+    'icon': ('Logo_Icon_red.png', 'sunsure-icon.png', (128, 128), 'PNG', None),
+    'icon_white': ('Logo_Icon_white.png', 'sunsure-icon-white.png', (64, 64), 'PNG', None),
+}
+
+MIME_TYPES = {'JPEG': 'image/jpeg', 'PNG': 'image/png'}
+
+Asset = namedtuple('Asset', ['name', 'path', 'file_name', 'mime', 'data'])
+
+
+def _is_fresh(target, source):
+    return os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source)
+
+
+def prepare_asset(name, base_dir=BASE_DIR, static_dir=STATIC_DIR):
+    """Return the prepared Asset, (re)building the static file only when the source changed"""
+    source_name, file_name, max_size, fmt, quality = ASSET_SPECS[name]
+    source = os.path.join(base_dir, source_name)
+    if not os.path.exists(source):
+        return None
+
+    target = os.path.join(static_dir, file_name)
+    if not _is_fresh(target, source):
+        os.makedirs(static_dir, exist_ok=True)
+        with Image.open(source) as image:
+            image.thumbnail(max_size, Image.LANCZOS)
+            if fmt == 'JPEG' and image.mode != 'RGB':
+                image = image.convert('RGB')
+            options = {'optimize': True}
+            if quality:
+                options.update(quality=quality, progressive=True)
+            # Write next to the target and swap in, so concurrent readers never see a partial file
+            tmp_path = f"{target}.{os.getpid()}.tmp"
+            image.save(tmp_path, fmt, **options)
+            os.replace(tmp_path, target)
+
+    with open(target, 'rb') as f:
+        data = f.read()
+    return Asset(name, target, file_name, MIME_TYPES[fmt], data)
+
+
+def prepare_assets(base_dir=BASE_DIR, static_dir=STATIC_DIR):
+    """Prepare every known asset; missing source images are left out"""
+    assets = {}
+    for name in ASSET_SPECS:
+        asset = prepare_asset(name, base_dir, static_dir)
+        if asset is not None:
+            assets[name] = asset
+    return assets
+
+
+def data_uri(asset):
+    return f"data:{asset.mime};base64,{base64.b64encode(asset.data).decode()}"
+
+
+def asset_url(asset, static_serving):
+    """URL of the served static file, or an inline data URI when static serving is off"""
+    if static_serving:
+        return f"{STATIC_URL}/{asset.file_name}?v={int(os.path.getmtime(asset.path))}"
+    return data_uri(asset)
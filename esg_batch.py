@@ -0,0 +1,153 @@
+"""
+ESG Batch Processing
+====================
+Headless portfolio extraction for scheduled runs (e.g. nightly cron).
+Runs the same extraction as the Sunsure dashboard over a directory of site
+workbooks, in parallel, and writes the Portfolio_KPIs / State_Summary reports
+to disk. Never imports Streamlit or Plotly.
+
+Usage:
+    python esg_batch.py path/to/workbooks --output-dir reports --workers 8
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from esg_cache import ParseCache
+from esg_ingest import create_pool, default_workers, ingest_workbooks
+from esg_portfolio import PortfolioTensor
+from esg_reports import build_exports
+from esg_sites import load_sites
+from esg_store import FactStore
+
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xls')
+
+
+def find_workbooks(directory, recursive=False):
+    """Sorted workbook paths in a directory, skipping Excel lock files (~$...)"""
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        for name in files:
+            if name.lower().endswith(WORKBOOK_EXTENSIONS) and not name.startswith('~$'):
+                paths.append(os.path.join(root, name))
+        if not recursive:
+            break
+    return sorted(paths)
+
+
+class StageTimer:
+    def __init__(self):
+        self.stages = []
+
+    def run(self, name, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.stages.append((name, time.perf_counter() - start))
+        return result
+
+    def report(self):
+        total = sum(seconds for _, seconds in self.stages)
+        lines = [f"  {name:<12s} {seconds:8.3f} s" for name, seconds in self.stages]
+        lines.append(f"  {'total':<12s} {total:8.3f} s")
+        return '\n'.join(lines)
+
+
+def site_name(file_name, sites):
+    """Site master name of a workbook, as the dashboard stores it; the file name stem when unlisted"""
+    return sites.site_name(file_name) or file_name.replace('.xlsx', '').replace('.xls', '')
+
+
+def read_jobs(paths, sites=None):
+    sites = sites or load_sites()
+    jobs = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = f.read()
+        file_name = os.path.basename(path)
+        jobs.append((data, file_name, site_name(file_name, sites)))
+    return jobs
+
+
+def extract(jobs, workers, cache=None):
+    if workers > 1 and len(jobs) > 1:
+        with create_pool(min(workers, len(jobs))) as pool:
+            return ingest_workbooks(jobs, 'sunsure', executor=pool, cache=cache)
+    return ingest_workbooks(jobs, 'sunsure', cache=cache)
+
+
+def aggregate(records):
+    tensor = PortfolioTensor.from_records(records)
+    return tensor.to_frame(), tensor.state_summary()
+
+
+def write_exports(exports, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    for file_name, payload in exports.items():
+        path = os.path.join(output_dir, file_name)
+        with open(path, 'wb') as f:
+            f.write(payload.encode('utf-8') if isinstance(payload, str) else payload)
+        written.append(path)
+    return written
+
+
+def run(directory, output_dir, workers, recursive=False, cache_dir=None, store_path=None):
+    """Process every workbook in a directory; returns a process exit code"""
+    timer = StageTimer()
+
+    paths = timer.run('discover', find_workbooks, directory, recursive)
+    if not paths:
+        print(f"No workbooks found in {directory}", file=sys.stderr)
+        return 1
+    print(f"Found {len(paths)} workbook(s) in {directory}")
+
+    jobs = timer.run('read', read_jobs, paths)
+    cache = ParseCache(cache_dir=cache_dir) if cache_dir else None
+    results = timer.run('extract', extract, jobs, workers, cache)
+
+    records = []
+    failures = 0
+    for (_, file_name, _), (record, error, _, _) in zip(jobs, results):
+        if error:
+            failures += 1
+            print(f"  ! {file_name}: {error}", file=sys.stderr)
+        elif record:
+            records.append(record)
+    if not records:
+        print("No data could be extracted from the workbooks", file=sys.stderr)
+        return 1
+
+    df, state_summary = timer.run('aggregate', aggregate, records)
+    if store_path:
+        timer.run('store', FactStore(store_path).write_records, records)
+    exports = timer.run('export', build_exports, df, state_summary)
+    written = timer.run('write', write_exports, exports, output_dir)
+
+    print(f"Extracted {len(records)} site(s), {failures} failure(s), {workers} worker(s)")
+    for path in written:
+        print(f"  wrote {path}")
+    print("Stage timings:")
+    print(timer.report())
+    return 0 if failures == 0 else 2
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Sunsure ESG portfolio extraction")
+    parser.add_argument('directory', help="Directory containing site Excel workbooks")
+    parser.add_argument('-o', '--output-dir', default='reports', help="Where to write the reports (default: reports)")
+    parser.add_argument('-w', '--workers', type=int, default=default_workers(),
+                        help="Parallel worker processes (default: ESG_INGEST_WORKERS or CPU count)")
+    parser.add_argument('-r', '--recursive', action='store_true', help="Also search sub-directories")
+    parser.add_argument('--cache-dir', help="Reuse parsed results from this on-disk cache")
+    parser.add_argument('--store', help="Also write site-month facts to this SQLite store")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"not a directory: {args.directory}")
+    return run(args.directory, args.output_dir, max(1, args.workers), args.recursive, args.cache_dir, args.store)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+ESG Parse Cache
+===============
+Cache of extracted site KPI records keyed by a hash of the uploaded file bytes.
+An in-memory LRU tier is always used; an optional on-disk tier keeps records
+across app restarts. This module does not import Streamlit.
+"""
+
+import copy
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Bump when the extraction output changes so stale records are never reused
+CACHE_VERSION = 6
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+def content_hash(data):
+    """Hex digest of raw file bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ParseCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, cache_dir=None):
+        self.max_entries = max(1, int(max_entries))
+        self.cache_dir = cache_dir
+        self._memory = OrderedDict()
+        # Sessions and ingest threads share one cache; the LRU is only touched under the lock
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(data, *parts):
+        """Build a cache key from file bytes plus anything else the record depends on"""
+        extra = '|'.join(str(part) for part in parts)
+        return content_hash(data) + '-' + hashlib.sha256(f"v{CACHE_VERSION}|{extra}".encode()).hexdigest()[:16]
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _remember(self, key, record):
+        with self._lock:
+            self._memory[key] = record
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return a copy of the cached record, or None"""
+        with self._lock:
+            record = self._memory.get(key)
+            if record is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+        if record is not None:
+            return copy.deepcopy(record)
+
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(key), 'rb') as f:
+                    record = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                record = None
+            if record is not None:
+                self._remember(key, record)
+                with self._lock:
+                    self.disk_hits += 1
+                return copy.deepcopy(record)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, record):
+        """Store a record in memory and, when configured, on disk"""
+        if record is None:
+            return
+        record = copy.deepcopy(record)
+        self._remember(key, record)
+
+        if self.cache_dir:
+            # Write to a temp file first so a crash never leaves a truncated entry
+            try:
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self._disk_path(key))
+            except OSError:
+                pass
+
+    def get_or_compute(self, data, compute, *parts):
+        """Return the cached record for these bytes, computing and storing it on a miss"""
+        key = self.make_key(data, *parts)
+        record = self.get(key)
+        if record is None:
+            record = compute()
+            self.put(key, record)
+        return record
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.cache_dir:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.pkl'):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, name))
+                    except OSError:
+                        pass
+
+    def __len__(self):
+        return len(self._memory)
@@ -0,0 +1,133 @@
+"""
+ESG Charts
+==========
+Plotly figures for the portal's portfolio analysis. Small portfolios get one
+bar per site. From LARGE_PORTFOLIO_SITES sites up, the bar charts show the
+TOP_N sites plus an "Others" bucket, and per-site intensity is drawn as a
+ranked WebGL scatter of every site, so the payload stays small however many
+sites are uploaded. This module does not import Streamlit.
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+LARGE_PORTFOLIO_SITES = 40
+TOP_N = 20
+
+
+def is_large(df):
+    return len(df) >= LARGE_PORTFOLIO_SITES
+
+
+def top_n_with_others(df, value_column, n=TOP_N, sum_columns=()):
+    """The n sites with the largest value_column plus one 'Others (k sites)' row summing the rest.
+
+    sum_columns are also summed into the Others row; other columns are left blank.
+    """
+    ranked = df.sort_values(value_column, ascending=False)
+    top, rest = ranked.head(n), ranked.iloc[n:]
+    if rest.empty:
+        return top
+    others = {'Site_Name': f"Others ({len(rest)} sites)"}
+    for column in dict.fromkeys((value_column, *sum_columns)):
+        others[column] = rest[column].sum()
+    return pd.concat([top, pd.DataFrame([others])], ignore_index=True)
+
+
+def emissions_figure(df):
+    title = 'GHG Emissions by Site'
+    if is_large(df):
+        df = top_n_with_others(df, 'Total_Emissions_tCO2e')
+        title = f'GHG Emissions - Top {TOP_N} Sites'
+    fig = px.bar(
+        df,
+        x='Site_Name',
+        y='Total_Emissions_tCO2e',
+        title=title,
+        color='Total_Emissions_tCO2e',
+        color_continuous_scale='Reds'
+    )
+    fig.update_layout(xaxis=dict(tickangle=45))
+    return fig
+
+
+def scope_figure(df):
+    scope_data = {
+        'Scope': ['Scope 1', 'Scope 3'],
+        'Emissions': [df['Scope1_Emissions_tCO2e'].sum(), df['Scope3_Materials_tCO2e'].sum()]
+    }
+    return px.pie(
+        pd.DataFrame(scope_data),
+        values='Emissions',
+        names='Scope',
+        title='Portfolio Emissions by Scope'
+    )
+
+
+def intensity_figure(df):
+    if not is_large(df):
+        fig = px.bar(
+            df,
+            x='Site_Name',
+            y='Emission_Intensity_tCO2e_per_MW',
+            title='Emission Intensity by Site (tCO2e/MW)',
+            color='Emission_Intensity_tCO2e_per_MW',
+            color_continuous_scale='Greens'
+        )
+        fig.update_layout(xaxis=dict(tickangle=45))
+        return fig
+
+    # Every site, ranked by intensity: one WebGL trace instead of hundreds of bar categories
+    ranked = df.sort_values('Emission_Intensity_tCO2e_per_MW', ascending=False)
+    intensity = ranked['Emission_Intensity_tCO2e_per_MW'].to_numpy(dtype=float)
+    fig = go.Figure(go.Scattergl(
+        x=np.arange(1, len(ranked) + 1),
+        y=intensity,
+        mode='markers',
+        text=ranked['Site_Name'],
+        hovertemplate='%{text}<br>%{y:.2f} tCO2e/MW<extra></extra>',
+        marker=dict(color=intensity, colorscale='Greens', showscale=True)
+    ))
+    fig.update_layout(title=f'Emission Intensity, All {len(ranked)} Sites Ranked (tCO2e/MW)',
+                      xaxis=dict(title='Site rank'), yaxis=dict(title='tCO2e/MW'))
+    return fig
+
+
+def resources_figure(df):
+    title = 'Resource Consumption by Site'
+    if is_large(df):
+        df = top_n_with_others(df, 'Diesel_Consumption_Liters', sum_columns=['Water_Consumption_Liters'])
+        title = f'Resource Consumption - Top {TOP_N} Sites by Diesel'
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        name='Diesel (Liters)',
+        x=df['Site_Name'],
+        y=df['Diesel_Consumption_Liters'],
+        yaxis='y'
+    ))
+    fig.add_trace(go.Bar(
+        name='Water (Liters)',
+        x=df['Site_Name'],
+        y=df['Water_Consumption_Liters'],
+        yaxis='y2'
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis=dict(tickangle=45),
+        yaxis=dict(title='Diesel (Liters)', side='left'),
+        yaxis2=dict(title='Water (Liters)', side='right', overlaying='y'),
+        barmode='group'
+    )
+    return fig
+
+
+def portfolio_figures(df):
+    """All portfolio analysis figures for a portal KPI frame, by name"""
+    return {
+        'emissions': emissions_figure(df),
+        'scope': scope_figure(df),
+        'intensity': intensity_figure(df),
+        'resources': resources_figure(df),
+    }
@@ -8,13 +8,18 @@ Built with Streamlit for easy deployment and use
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
 from datetime import datetime
 import os
-import zipfile
-import io
+from esg_records import portal_frame
+from esg_cache import ParseCache, DEFAULT_MAX_ENTRIES
+from esg_reports import ExportCache, excel_workbook, frame_fingerprint, report_bundle
+from esg_charts import TOP_N, is_large, portfolio_figures
+from esg_sites import load_sites
+from esg_ingest import create_pool, default_workers, ingest_workbooks
+from esg_profiling import StageProfile, activated, stage
+from esg_debug import debug_panel, show_profile
 
 # Page configuration
 st.set_page_config(
@@ -47,126 +52,72 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_ingest_pool(max_workers):
+    """Process pool reused across reruns (one per worker count)"""
+    return create_pool(max_workers)
+
+@st.cache_resource
+def get_parse_cache():
+    """Process-wide cache of parsed site KPIs (configure with ESG_CACHE_MAX_ENTRIES / ESG_CACHE_DIR)"""
+    return ParseCache(
+        max_entries=int(os.environ.get('ESG_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+        cache_dir=os.environ.get('ESG_CACHE_DIR') or None
+    )
+
+@st.cache_resource
+def get_export_cache():
+    """Process-wide cache of download payloads, keyed by a hash of the exported data"""
+    return ExportCache()
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def portfolio_figures_cached(data_key, _df):
+    """Portfolio figures for a KPI frame, reused while its data hash is unchanged"""
+    return portfolio_figures(_df)
+
 class ESGDashboardPortal:
-    def __init__(self):
+    def __init__(self, cache=None, profile=None, export_cache=None):
         self.processed_data = None
         self.kpis = {}
+        self.cache = cache
+        self.export_cache = export_cache or ExportCache()
+        # StageProfile collecting per-file and per-stage timings, when the debug panel asks for one
+        self.profile = profile
+
+    def process_uploaded_files(self, uploaded_files, executor=None, on_progress=None):
+        """Process all uploads (in parallel when an executor is given), keeping upload order"""
+        jobs = [(f.getvalue(), f.name, f.name.replace('.xlsx', '').replace('.xls', '')) for f in uploaded_files]
+        profiled = self.profile is not None
+        results = ingest_workbooks(jobs, 'portal', executor=executor, cache=self.cache, on_progress=on_progress,
+                                   profile=profiled, trace_memory=profiled and self.profile.trace_memory)
 
-    def process_excel_file(self, uploaded_file, site_name):
-        """Process a single uploaded Excel file"""
-        try:
-            # Read Excel file
-            excel_data = pd.read_excel(uploaded_file, sheet_name=None)
-
-            # Find the main data sheet
-            main_sheet_names = ['Project 1', 'Site_Template', 'Consolidated_Data', 'Data']
-            main_sheet = None
-
-            for sheet_name in main_sheet_names:
-                if sheet_name in excel_data:
-                    main_sheet = excel_data[sheet_name]
-                    break
-
-            if main_sheet is None:
-                main_sheet = list(excel_data.values())[0]
-
-            # Extract site information and KPIs
-            site_kpis = self.extract_site_kpis(main_sheet, site_name)
-
-            return site_kpis
-
-        except Exception as e:
-            st.error(f"Error processing {site_name}: {str(e)}")
-            return None
-
-    def extract_site_kpis(self, data_sheet, site_name):
-        """Extract KPIs from a single site's data"""
-        kpis = {
-            'Site_Name': site_name,
-            'Report_Date': datetime.now().strftime('%Y-%m-%d')
-        }
-
-        try:
-            # Extract diesel consumption
-            diesel_total = 0
-            water_total = 0
-            concrete_total = 0
-            steel_total = 0
-
-            # Look for specific rows and extract monthly data
-            for idx, row in data_sheet.iterrows():
-                row_str = str(row.iloc[2]).lower() if len(row) > 2 else ""
-
-                if 'diesel' in row_str:
-                    monthly_values = self.extract_monthly_values(row)
-                    diesel_total += sum(monthly_values)
-
-                elif 'water' in row_str:
-                    monthly_values = self.extract_monthly_values(row)
-                    water_total += sum(monthly_values)
-
-                elif 'concrete' in row_str:
-                    monthly_values = self.extract_monthly_values(row)
-                    concrete_total += sum(monthly_values)
-
-                elif 'steel' in row_str or 'metal' in row_str:
-                    monthly_values = self.extract_monthly_values(row)
-                    steel_total += sum(monthly_values)
-
-            # Calculate KPIs
-            kpis['Diesel_Consumption_Liters'] = diesel_total
-            kpis['Water_Consumption_Liters'] = water_total
-            kpis['Concrete_Usage_Tons'] = concrete_total
-            kpis['Steel_Usage_Tons'] = steel_total
-
-            # Emission calculations (using standard emission factors)
-            kpis['Scope1_Emissions_tCO2e'] = diesel_total * 0.00268  # 2.68 kg CO2e/liter
-            kpis['Scope3_Materials_tCO2e'] = (concrete_total * 0.52) + (steel_total * 2.3)  # Material emission factors
-            kpis['Total_Emissions_tCO2e'] = kpis['Scope1_Emissions_tCO2e'] + kpis['Scope3_Materials_tCO2e']
-
-            # Assume 100MW capacity (can be extracted from site master data)
-            site_capacity = 100
-            kpis['Site_Capacity_MW'] = site_capacity
-            kpis['Emission_Intensity_tCO2e_per_MW'] = kpis['Total_Emissions_tCO2e'] / site_capacity
-            kpis['Water_Intensity_L_per_MW'] = water_total / site_capacity
-            kpis['Fuel_Intensity_L_per_MW'] = diesel_total / site_capacity
-
-        except Exception as e:
-            st.warning(f"Error extracting KPIs for {site_name}: {str(e)}")
-
-        return kpis
-
-    def extract_monthly_values(self, row):
-        """Extract numeric values from monthly columns"""
-        values = []
-        # Check columns 5-16 for monthly data
-        for i in range(5, min(17, len(row))):
-            try:
-                val = row.iloc[i]
-                if pd.isna(val):
-                    values.append(0)
-                elif isinstance(val, (int, float)):
-                    values.append(val)
-                elif isinstance(val, str):
-                    # Extract numbers from strings like "8500 Litre"
-                    import re
-                    numbers = re.findall(r'\d+', val)
-                    if numbers:
-                        values.append(float(numbers[0]))
-                    else:
-                        values.append(0)
-                else:
-                    values.append(0)
-            except:
-                values.append(0)
+        all_site_kpis = []
+        for (_, _, site_name), (site_kpis, error, _, stages) in zip(jobs, results):
+            if profiled:
+                self.profile.add(stages)
+            if error:
+                st.error(f"Error processing {site_name}: {error}")
+            elif site_kpis:
+                # Cached records keep their original date; report today's run
+                site_kpis.report_date = datetime.now().strftime('%Y-%m-%d')
+                all_site_kpis.append(site_kpis)
 
-        return values
+        return all_site_kpis
 
-    def create_portfolio_dashboard(self, all_site_kpis):
+    def create_portfolio_dashboard(self, all_site_kpis, executor=None):
         """Create comprehensive portfolio dashboard"""
 
-        # Convert to DataFrame
-        df = pd.DataFrame(all_site_kpis)
+        # Convert to DataFrame: the records' figures stack into one float block
+        with stage('aggregate'):
+            df = portal_frame(all_site_kpis)
+            # Site master attributes for all sites in one lookup, next to the site name
+            sites = load_sites().attributes(df['Site_Name'])
+            df.insert(1, 'State', pd.Categorical(sites['State']))
+            df.insert(2, 'Technology', pd.Categorical(sites['Technology']))
+            df.insert(3, 'Site_Category', sites['Site_Category'].to_numpy())
+            df.insert(4, 'Commissioning_Date', sites['Commissioning_Date'].dt.strftime('%Y-%m-%d').to_numpy())
+            # Keys the cached figures and downloads
+            data_key = frame_fingerprint(df)
 
         # Portfolio Summary KPIs
         col1, col2, col3, col4 = st.columns(4)
@@ -185,7 +136,7 @@ class ESGDashboardPortal:
             st.markdown("""
             <div class="kpi-card">
                 <h3>Portfolio Capacity</h3>
-                <div class="metric-value">{} MW</div>
+                <div class="metric-value">{:,.0f} MW</div>
             </div>
             """.format(total_capacity), unsafe_allow_html=True)
 
@@ -207,77 +158,33 @@ class ESGDashboardPortal:
             </div>
             """.format(avg_intensity), unsafe_allow_html=True)
 
-        # Create visualizations
+        # Create visualizations; figures are cached by a hash of the KPI data
+        with stage('figures'):
+            figures = portfolio_figures_cached(data_key, df)
+
         st.markdown("## 📊 Portfolio Analysis")
+        if is_large(df):
+            st.caption(f"{len(df)} sites: bar charts show the top {TOP_N} sites plus all others combined")
 
         # Site-wise emissions chart
         col1, col2 = st.columns(2)
 
         with col1:
-            fig_emissions = px.bar(
-                df, 
-                x='Site_Name', 
-                y='Total_Emissions_tCO2e',
-                title='GHG Emissions by Site',
-                color='Total_Emissions_tCO2e',
-                color_continuous_scale='Reds'
-            )
-            fig_emissions.update_layout(xaxis=dict(tickangle=45))
-            st.plotly_chart(fig_emissions, use_container_width=True)
+            st.plotly_chart(figures['emissions'], use_container_width=True)
 
         with col2:
             # Scope-wise breakdown
-            scope_data = {
-                'Scope': ['Scope 1', 'Scope 3'],
-                'Emissions': [df['Scope1_Emissions_tCO2e'].sum(), df['Scope3_Materials_tCO2e'].sum()]
-            }
-            fig_scope = px.pie(
-                pd.DataFrame(scope_data),
-                values='Emissions',
-                names='Scope',
-                title='Portfolio Emissions by Scope'
-            )
-            st.plotly_chart(fig_scope, use_container_width=True)
+            st.plotly_chart(figures['scope'], use_container_width=True)
 
         # Intensity comparison
         col1, col2 = st.columns(2)
 
         with col1:
-            fig_intensity = px.bar(
-                df,
-                x='Site_Name',
-                y='Emission_Intensity_tCO2e_per_MW',
-                title='Emission Intensity by Site (tCO2e/MW)',
-                color='Emission_Intensity_tCO2e_per_MW',
-                color_continuous_scale='Greens'
-            )
-            fig_intensity.update_layout(xaxis=dict(tickangle=45))
-            st.plotly_chart(fig_intensity, use_container_width=True)
+            st.plotly_chart(figures['intensity'], use_container_width=True)
 
         with col2:
             # Resource consumption
-            fig_resources = go.Figure()
-            fig_resources.add_trace(go.Bar(
-                name='Diesel (Liters)',
-                x=df['Site_Name'],
-                y=df['Diesel_Consumption_Liters'],
-                yaxis='y'
-            ))
-            fig_resources.add_trace(go.Bar(
-                name='Water (Liters)',
-                x=df['Site_Name'],
-                y=df['Water_Consumption_Liters'],
-                yaxis='y2'
-            ))
-
-            fig_resources.update_layout(
-                title='Resource Consumption by Site',
-                xaxis=dict(tickangle=45),
-                yaxis=dict(title='Diesel (Liters)', side='left'),
-                yaxis2=dict(title='Water (Liters)', side='right', overlaying='y'),
-                barmode='group'
-            )
-            st.plotly_chart(fig_resources, use_container_width=True)
+            st.plotly_chart(figures['resources'], use_container_width=True)
 
         # Data table
         st.markdown("## 📋 Detailed KPI Table")
@@ -300,29 +207,47 @@ class ESGDashboardPortal:
         # Export functionality
         st.markdown("## 💾 Export Results")
 
-        col1, col2 = st.columns(2)
+        col1, col2, col3 = st.columns(3)
+
+        # Files are built when a button is clicked (on the download's own thread) and
+        # cached by content, so rendering the dashboard does not pay for them
+        export_key = data_key
+        excel_name = f"ESG_Portfolio_Report_{datetime.now().strftime('%Y%m%d')}.xlsx"
+        csv_name = f"ESG_Portfolio_Data_{datetime.now().strftime('%Y%m%d')}.csv"
+        bundle_name = f"ESG_Report_Bundle_{datetime.now().strftime('%Y%m%d')}.zip"
+        export_cache = self.export_cache
 
         with col1:
             # Create Excel export
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name='Portfolio_KPIs', index=False)
-
             st.download_button(
                 label="📊 Download Excel Report",
-                data=output.getvalue(),
-                file_name=f"ESG_Portfolio_Report_{datetime.now().strftime('%Y%m%d')}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                data=lambda: export_cache.get_or_build(
+                    export_key, excel_name, lambda: excel_workbook({'Portfolio_KPIs': df})),
+                file_name=excel_name,
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                on_click="ignore"
             )
 
         with col2:
             # Create CSV export
-            csv = df.to_csv(index=False)
             st.download_button(
                 label="📄 Download CSV Data",
-                data=csv,
-                file_name=f"ESG_Portfolio_Data_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
+                data=lambda: export_cache.get_or_build(export_key, csv_name, lambda: df.to_csv(index=False)),
+                file_name=csv_name,
+                mime="text/csv",
+                on_click="ignore"
+            )
+
+        with col3:
+            # Portfolio workbook plus one detail workbook per site, in one ZIP; the cache
+            # keeps the archive on disk and it is read back only for the download
+            st.download_button(
+                label="🗂️ Download Report Bundle (ZIP)",
+                data=lambda: export_cache.get_or_build(export_key, bundle_name, lambda: report_bundle(
+                    excel_name, {'Portfolio_KPIs': df}, all_site_kpis, executor)).read(),
+                file_name=bundle_name,
+                mime="application/zip",
+                on_click="ignore"
             )
 
 def main():
@@ -333,7 +258,7 @@ def main():
     st.markdown("### Upload your site Excel files to generate comprehensive ESG KPIs")
 
     # Initialize the portal
-    portal = ESGDashboardPortal()
+    portal = ESGDashboardPortal(cache=get_parse_cache(), export_cache=get_export_cache())
 
     # Sidebar for file uploads
     with st.sidebar:
@@ -347,6 +272,16 @@ def main():
             help="Upload one Excel file per site"
         )
 
+        ingest_workers = st.number_input(
+            "Parallel workers",
+            min_value=1,
+            max_value=max(os.cpu_count() or 1, default_workers()),
+            value=default_workers(),
+            help="Number of processes used to parse uploaded files"
+        )
+
+        profile_enabled, profile_memory, profile_output = debug_panel('portal_debug')
+
         if uploaded_files:
             st.success(f"✅ {len(uploaded_files)} files uploaded")
 
@@ -362,30 +297,29 @@ def main():
         progress_bar = st.progress(0)
         status_text = st.empty()
 
-        all_site_kpis = []
-
-        # Process each file
-        for i, uploaded_file in enumerate(uploaded_files):
+        def on_progress(done, total, file_name):
+            status_text.text(f"Processed {file_name} ({done}/{total})")
+            progress_bar.progress(done / total)
 
-            status_text.text(f"Processing {uploaded_file.name}...")
-            progress_bar.progress((i + 1) / len(uploaded_files))
+        # Process files, in parallel when more than one worker is configured
+        executor = get_ingest_pool(ingest_workers) if ingest_workers > 1 else None
+        portal.profile = StageProfile(trace_memory=profile_memory) if profile_enabled else None
+        with activated(portal.profile):
+            # Elapsed time of the whole (possibly parallel) parse; per-file stages add up to more
+            with stage('ingest', trace_memory=False):
+                all_site_kpis = portal.process_uploaded_files(uploaded_files, executor, on_progress)
 
-            # Extract site name from filename
-            site_name = uploaded_file.name.replace('.xlsx', '').replace('.xls', '')
+            status_text.text("✅ All files processed successfully!")
 
-            # Process the file
-            site_kpis = portal.process_excel_file(uploaded_file, site_name)
-
-            if site_kpis:
-                all_site_kpis.append(site_kpis)
+            if all_site_kpis:
+                # Create the dashboard
+                portal.create_portfolio_dashboard(all_site_kpis, executor)
+            else:
+                st.error("❌ No data could be extracted from the uploaded files")
 
-        status_text.text("✅ All files processed successfully!")
-
-        if all_site_kpis:
-            # Create the dashboard
-            portal.create_portfolio_dashboard(all_site_kpis)
-        else:
-            st.error("❌ No data could be extracted from the uploaded files")
+        if portal.profile is not None:
+            log_path = portal.profile.write_jsonl(app='portal', files=len(uploaded_files), workers=ingest_workers)
+            st.session_state.last_profile = (portal.profile, log_path)
 
     elif not uploaded_files:
         # Landing page content
@@ -445,5 +379,8 @@ def main():
 
             st.plotly_chart(fig_sample, use_container_width=True)
 
+    # Breakdown of the last profiled run in the sidebar debug panel
+    show_profile(profile_output, *st.session_state.get('last_profile', (None, None)))
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,33 @@
+"""
+ESG Debug Panel
+===============
+Sidebar panel shared by both dashboards: switches for per-stage profiling
+and the breakdown of the last profiled run (stage totals and the slowest
+files). Profiles are recorded with esg_profiling.
+"""
+
+import streamlit as st
+
+
+def debug_panel(key):
+    """Render the panel switches; returns (enabled, trace_memory, container for the results)"""
+    with st.sidebar.expander("🛠️ Performance Debug"):
+        enabled = st.checkbox("Record stage timings", key=f"{key}_enabled",
+                              help="Wall time, CPU time and peak memory per stage and per file")
+        trace_memory = st.checkbox("Track peak memory (slower)", key=f"{key}_memory", disabled=not enabled)
+        output = st.container()
+    return enabled, enabled and trace_memory, output
+
+
+def show_profile(output, profile, log_path=None):
+    """Fill the panel with a StageProfile's stage totals and its 10 slowest files"""
+    if profile is None:
+        return
+    with output:
+        st.caption(f"Run {profile.run_id}")
+        st.markdown("**Stages**")
+        st.dataframe(profile.stage_summary().round(4), use_container_width=True, hide_index=True)
+        st.markdown("**10 slowest files**")
+        st.dataframe(profile.slowest_files(10).round(4), use_container_width=True, hide_index=True)
+        if log_path:
+            st.caption(f"Appended to {log_path}")
@@ -0,0 +1,366 @@
+"""
+ESG Extraction Engine
+=====================
+Columnar extraction of monthly resource activity from GHG accounting sheets.
+Rows are labelled in one pass over the description column and the monthly
+block is converted to numbers column by column, so no per-row Python loop runs.
+This module does not import Streamlit and can be used from scripts.
+"""
+
+import re
+import zipfile
+from datetime import datetime
+from itertools import chain, islice
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from openpyxl.utils.exceptions import InvalidFileException
+from pandas.api.types import is_bool_dtype, is_numeric_dtype, is_object_dtype, is_string_dtype
+
+from esg_factors import load_factors
+from esg_profiling import stage
+from esg_sites import load_sites
+from esg_periods import detect_period, period_key, rows_period, sheet_period
+from esg_records import RESOURCE_FIELDS, PortalKPIRecord, SunsureKPIRecord
+from esg_schema import DEFAULT_SCHEMA, SCHEMA_SCAN_ROWS, frame_schema, schema_columns, template_schema
+
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+          'August', 'September', 'October', 'November', 'December']
+
+MAIN_SHEET_NAMES = ['Project 1', 'Site_Template', 'Consolidated_Data', 'Data']
+
+# Original template layout: activity description in column 2, January-December in columns 5-16.
+# Sheets are read by their detected template schema (esg_schema); this is its fallback
+DESCRIPTION_COL = DEFAULT_SCHEMA.description_col
+FIRST_MONTH_COL = DEFAULT_SCHEMA.month_cols[0]
+EXTRACTION_COLUMNS = [DESCRIPTION_COL] + list(DEFAULT_SCHEMA.month_cols)
+
+# read_main_sheet() default: keep the columns of the sheet's own template schema
+SCHEMA_COLUMNS = 'schema'
+
+# Number patterns used by the dashboards: decimals (Sunsure) and leading integer (portal)
+DECIMAL_PATTERN = r'(\d+\.?\d*)'
+INTEGER_PATTERN = r'(\d+)'
+
+# Resource rules in priority order: the first rule whose keywords match a row wins
+SUNSURE_RESOURCES = [
+    ('water', ('water',)),
+    ('diesel', ('diesel', 'fuel')),
+    ('electricity', ('electricity',)),
+    ('cement', ('cement',)),
+]
+PORTAL_RESOURCES = [
+    ('diesel', ('diesel',)),
+    ('water', ('water',)),
+    ('concrete', ('concrete',)),
+    ('steel', ('steel', 'metal')),
+]
+
+# Unit each resource is recorded in by the templates; emission factors are looked up by (resource, unit)
+RESOURCE_UNITS = {
+    'water': 'L', 'diesel': 'L', 'electricity': 'kWh', 'cement': 'kg', 'concrete': 't', 'steel': 't',
+}
+
+def site_attributes(filename, sites=None):
+    """Return (state, capacity_mw, technology) for a file from the site master, else its name"""
+    return (sites or load_sites()).resolve(filename)
+
+
+def select_main_sheet(sheet_names):
+    """Pick the main data sheet name using the template priority order"""
+    for sheet_name in MAIN_SHEET_NAMES:
+        if sheet_name in sheet_names:
+            return sheet_name
+    return sheet_names[0]
+
+
+def _row_width(row):
+    """Position after the last non-empty cell of a row"""
+    n = len(row)
+    while n and (row[n - 1] is None or row[n - 1] == ''):
+        n -= 1
+    return n
+
+
+def read_main_sheet(source, columns=SCHEMA_COLUMNS):
+    """Read only the main data sheet of a workbook, keeping only the given column positions.
+
+    Other sheets are never parsed. Columns are labelled by position and the
+    dropped ones come back as empty placeholders, so positional access and
+    the sheet width match a full read_excel() of the same sheet. By default
+    the description, unit and month columns of the sheet's template schema
+    are kept; pass columns=None to keep every column. The schema is attached
+    as frame.attrs['schema'].
+    """
+    try:
+        with stage('load_workbook'):
+            workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile):
+        # Legacy .xls and other formats: let pandas pick the engine, still reading one sheet
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        with stage('load_workbook'):
+            excel_file = pd.ExcelFile(source)
+        with stage('read_rows'):
+            frame = excel_file.parse(select_main_sheet(excel_file.sheet_names))
+        schema = frame_schema(frame)
+        frame.columns = range(frame.shape[1])
+        frame.attrs['schema'] = schema
+        return frame
+
+    try:
+        with stage('find_main_sheet'):
+            worksheet = workbook[select_main_sheet(workbook.sheetnames)]
+            # Some writers save a wrong <dimension>; forget it so every stored row is read
+            worksheet.reset_dimensions()
+        with stage('read_rows'):
+            # The top rows give the template schema (cached by header layout) before any column is dropped
+            rows = worksheet.iter_rows(values_only=True)
+            head = list(islice(rows, SCHEMA_SCAN_ROWS))
+            schema = template_schema(head)
+            if columns is SCHEMA_COLUMNS:
+                columns = schema_columns(schema)
+            keep = sorted(set(columns)) if columns is not None else None
+            records = []
+            width = 0
+            last_filled = 0
+            for row in chain(head, rows):
+                row_width = _row_width(row)
+                if row_width:
+                    width = max(width, row_width)
+                    last_filled = len(records) + 1
+                if keep is None:
+                    records.append(row)
+                else:
+                    records.append(tuple(row[c] if c < len(row) else None for c in keep))
+    finally:
+        workbook.close()
+
+    with stage('build_frame'):
+        # The first row is the header, as with read_excel(header=0); trailing blank rows are dropped
+        records = records[1:last_filled]
+        if keep is None:
+            keep = list(range(width))
+            records = [tuple(row[:width]) + (None,) * (width - len(row)) for row in records]
+
+        frame = pd.DataFrame.from_records(records, columns=keep) if records else pd.DataFrame(columns=keep)
+        frame = frame.reindex(columns=range(width))
+        frame.attrs['schema'] = schema
+        return frame
+
+
+def classify_rows(sheet, resources, min_columns=DESCRIPTION_COL + 1, schema=None):
+    """Label every row with its resource name (None for unmatched rows)"""
+    description_col = (schema or frame_schema(sheet)).description_col
+    if sheet.shape[1] < max(min_columns, description_col + 1):
+        return pd.Series([None] * len(sheet), index=sheet.index, dtype=object)
+
+    desc = sheet.iloc[:, description_col]
+    desc = desc.where(desc.notna(), '').astype(str).str.lower()
+
+    conditions = []
+    for _, keywords in resources:
+        mask = np.zeros(len(sheet), dtype=bool)
+        for keyword in keywords:
+            mask |= desc.str.contains(keyword, regex=False).to_numpy(dtype=bool)
+        conditions.append(mask)
+
+    labels = np.select(conditions, [name for name, _ in resources], default=None) if conditions else None
+    return pd.Series(labels, index=sheet.index, dtype=object)
+
+
+def column_to_numbers(column, pattern=DECIMAL_PATTERN):
+    """Convert one monthly column to floats: numbers as-is, first number in text, else 0"""
+    if is_bool_dtype(column) or is_numeric_dtype(column):
+        return column.astype(float).fillna(0).to_numpy()
+    if not (is_object_dtype(column) or is_string_dtype(column)):
+        # Datetime and other typed columns never carry activity values
+        return np.zeros(len(column))
+
+    is_text = column.map(type).eq(str)
+    numbers = pd.to_numeric(column.mask(is_text), errors='coerce')
+    text_numbers = column.where(is_text).str.extract(pattern, expand=False).astype(float)
+    return numbers.fillna(text_numbers).fillna(0).to_numpy(dtype=float)
+
+
+def monthly_matrix(sheet, pattern=DECIMAL_PATTERN, month_cols=DEFAULT_SCHEMA.month_cols):
+    """Return an (n_rows, 12) float array of the January-December columns (sheet positions in month_cols)"""
+    matrix = np.zeros((len(sheet), len(MONTHS)))
+    for m, col_idx in enumerate(month_cols):
+        if col_idx < sheet.shape[1]:
+            matrix[:, m] = column_to_numbers(sheet.iloc[:, col_idx], pattern)
+    return matrix
+
+
+def extract_resource_monthly(sheet, resources, pattern=DECIMAL_PATTERN, min_columns=DESCRIPTION_COL + 1, schema=None):
+    """Sum monthly values per resource; returns a DataFrame indexed by resource name.
+
+    Columns come from schema, by default the sheet's template schema.
+    """
+    names = [name for name, _ in resources]
+    schema = schema or frame_schema(sheet)
+    labels = classify_rows(sheet, resources, min_columns, schema)
+    matched = labels.notna().to_numpy()
+
+    if not matched.any():
+        return pd.DataFrame(0.0, index=names, columns=MONTHS)
+
+    # Only convert the rows that matched a resource
+    values = monthly_matrix(sheet.iloc[matched], pattern, schema.month_cols)
+    monthly = pd.DataFrame(values, columns=MONTHS).groupby(labels[matched].to_numpy()).sum()
+    return monthly.reindex(names, fill_value=0.0)
+
+
+def _cell_number(value, number_re):
+    """Single-cell version of column_to_numbers()"""
+    if isinstance(value, (int, float)):
+        return float(value) if value == value else 0.0
+    if isinstance(value, str):
+        match = number_re.search(value)
+        return float(match.group(1)) if match else 0.0
+    return 0.0
+
+
+def stream_resource_monthly(source, resources, pattern=DECIMAL_PATTERN, min_columns=DESCRIPTION_COL + 1):
+    """Streaming counterpart of extract_resource_monthly() for very large workbooks.
+
+    Rows are read one at a time from openpyxl's read-only iterator and only the
+    per-resource monthly accumulators are kept, so memory does not grow with
+    the number of rows. Returns the same DataFrame as extract_resource_monthly().
+    """
+    return _stream_resource_monthly(source, resources, pattern, min_columns)[0]
+
+
+def _stream_resource_monthly(source, resources, pattern, min_columns):
+    # (monthly totals, sheet_period() of the rows the DataFrame path would see, or None)
+    names = [name for name, _ in resources]
+    rules = [tuple(keyword.lower() for keyword in keywords) for _, keywords in resources]
+    number_re = re.compile(pattern)
+    totals = [[0.0] * len(MONTHS) for _ in resources]
+    width = 0
+
+    try:
+        workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile):
+        # Formats openpyxl cannot stream go through the DataFrame path
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        sheet = read_main_sheet(source)
+        return extract_resource_monthly(sheet, resources, pattern, min_columns), sheet_period(sheet)
+
+    try:
+        worksheet = workbook[select_main_sheet(workbook.sheetnames)]
+        worksheet.reset_dimensions()
+        rows = worksheet.iter_rows(values_only=True)
+        head = list(islice(rows, SCHEMA_SCAN_ROWS))
+        schema = template_schema(head)
+        description_col, month_cols = schema.description_col, schema.month_cols
+        # Same cells as sheet_period() reads from read_main_sheet(): rows after the header, schema columns only
+        keep = schema_columns(schema)
+        found = rows_period(tuple(row[c] if c < len(row) else None for c in keep) for row in head[1:])
+        for row_idx, row in enumerate(chain(head, rows)):
+            width = max(width, _row_width(row))
+            # The first row is the header, as with read_excel(header=0)
+            if row_idx == 0 or len(row) <= description_col or row[description_col] is None:
+                continue
+
+            desc = str(row[description_col]).lower()
+            for r, keywords in enumerate(rules):
+                if any(keyword in desc for keyword in keywords):
+                    acc = totals[r]
+                    for m, c in enumerate(month_cols):
+                        if c < len(row):
+                            acc[m] += _cell_number(row[c], number_re)
+                    break
+    finally:
+        workbook.close()
+
+    # Narrow sheets are skipped as a whole, matching the DataFrame path
+    if width < max(min_columns, schema.description_col + 1):
+        totals = [[0.0] * len(MONTHS) for _ in resources]
+    return pd.DataFrame(totals, index=names, columns=MONTHS), found
+
+
+def scope_emissions(monthly, state='', period='', factors=None):
+    """Emissions (tCO2e) per scope for per-resource monthly totals, from the emission factor registry"""
+    factors = factors or load_factors()
+    scopes = {}
+    for resource, total in monthly.sum(axis=1).items():
+        scope, factor = factors.resolve(resource, RESOURCE_UNITS[resource], state, period)
+        if scope is not None:
+            scopes[scope] = scopes.get(scope, 0.0) + total * factor
+    return scopes
+
+
+def reporting_period(file_name, sheet=None, sheet_found=None):
+    """Store period ('2025') of a workbook from its file name, else its sheet; '' when neither names one.
+
+    sheet_found is the sheet's (year, month) when already read, as when streaming.
+    """
+    found = detect_period(file_name)
+    if found is None and sheet is not None:
+        found = sheet_period(sheet)
+    if found is None:
+        found = sheet_found
+    return period_key(found[0]) if found else ''
+
+
+def sunsure_kpis_from_monthly(monthly, file_name, site_name, factors=None, period=None):
+    """Build the Sunsure dashboard KPI record (a SunsureKPIRecord) from per-resource monthly totals"""
+    state, capacity, tech = site_attributes(file_name)
+    period = reporting_period(file_name) if period is None else period
+    scopes = scope_emissions(monthly, state, period, factors=factors)
+
+    return SunsureKPIRecord(
+        site_name, state, capacity, tech,
+        monthly.loc[list(RESOURCE_FIELDS)].to_numpy(dtype=float),
+        [scopes.get(1, 0.0), scopes.get(2, 0.0), scopes.get(3, 0.0)],
+        period
+    )
+
+
+def sunsure_site_kpis(main_sheet, file_name, site_name):
+    """Build the Sunsure dashboard KPI record for one site"""
+    monthly = extract_resource_monthly(main_sheet, SUNSURE_RESOURCES, DECIMAL_PATTERN, min_columns=4)
+    return sunsure_kpis_from_monthly(monthly, file_name, site_name, period=reporting_period(file_name, main_sheet))
+
+
+def stream_sunsure_site_kpis(source, file_name, site_name):
+    """Constant-memory version of sunsure_site_kpis() reading straight from the workbook"""
+    monthly, found = _stream_resource_monthly(source, SUNSURE_RESOURCES, DECIMAL_PATTERN, min_columns=4)
+    period = reporting_period(file_name, sheet_found=found)
+    return sunsure_kpis_from_monthly(monthly, file_name, site_name, period=period)
+
+
+def portal_kpis_from_monthly(monthly, site_name, factors=None):
+    """Build the ESG portal KPI record (a PortalKPIRecord) from per-resource monthly totals"""
+    diesel_total, water_total, concrete_total, steel_total = monthly.sum(axis=1).tolist()
+
+    # Emission calculations (factors from the emission factor registry)
+    scopes = scope_emissions(monthly, factors=factors)
+    scope1, scope3 = scopes.get(1, 0.0), scopes.get(3, 0.0)
+    total_emissions = scope1 + scope3
+
+    # Capacity from the site master, else the file name, else 100 MW
+    site_capacity = site_attributes(site_name)[1]
+    # Per-MW figures are undefined (NaN) for a site listed without capacity
+    per_mw = site_capacity if site_capacity > 0 else float('nan')
+
+    return PortalKPIRecord(site_name, datetime.now().strftime('%Y-%m-%d'), [
+        diesel_total, water_total, concrete_total, steel_total,
+        scope1, scope3, total_emissions, site_capacity,
+        total_emissions / per_mw, water_total / per_mw, diesel_total / per_mw,
+    ])
+
+
+def portal_site_kpis(main_sheet, site_name):
+    """Build the ESG portal KPI record for one site"""
+    monthly = extract_resource_monthly(main_sheet, PORTAL_RESOURCES, INTEGER_PATTERN)
+    return portal_kpis_from_monthly(monthly, site_name)
+
+
+def stream_portal_site_kpis(source, site_name):
+    """Constant-memory version of portal_site_kpis() reading straight from the workbook"""
+    monthly = stream_resource_monthly(source, PORTAL_RESOURCES, INTEGER_PATTERN)
+    return portal_kpis_from_monthly(monthly, site_name)
@@ -0,0 +1,108 @@
+"""
+ESG Emission Factors
+====================
+Registry of emission factors loaded from a versioned CSV file
+(emission_factors.csv, or the file named by ESG_FACTORS_PATH). Factors are
+keyed by resource, unit, state and period; a blank state or period applies to
+all. Emissions are computed with one join of an activity table against the
+registry. This module does not import Streamlit.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from esg_cache import content_hash
+
+DEFAULT_FACTORS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'emission_factors.csv')
+
+FACTOR_KEY = ['resource', 'unit', 'state', 'period']
+FACTOR_COLUMNS = ['version'] + FACTOR_KEY + ['scope', 'factor_tco2e_per_unit']
+
+_loaded = {}
+
+
+def default_factors_path():
+    return os.environ.get('ESG_FACTORS_PATH') or DEFAULT_FACTORS_PATH
+
+
+class EmissionFactors:
+    def __init__(self, table, version, fingerprint):
+        self.table = table
+        self.version = version
+        # Changes with any edit to the file, even when the version was not bumped
+        self.fingerprint = fingerprint
+        self._resolved = {}
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        table = pd.read_csv(path, dtype={'version': str, 'resource': str, 'unit': str, 'state': str, 'period': str},
+                            keep_default_na=False)
+        missing = [column for column in FACTOR_COLUMNS if column not in table.columns]
+        if missing:
+            raise ValueError(f"{path}: missing column(s) {', '.join(missing)}")
+
+        versions = table['version'].unique()
+        if len(versions) != 1:
+            raise ValueError(f"{path}: expected one version, found {', '.join(versions) or 'none'}")
+        duplicates = table[table.duplicated(FACTOR_KEY, keep=False)]
+        if not duplicates.empty:
+            raise ValueError(f"{path}: duplicate factors for {duplicates[FACTOR_KEY].drop_duplicates().values.tolist()}")
+
+        table = table[FACTOR_KEY + ['scope', 'factor_tco2e_per_unit']].rename(
+            columns={'state': 'factor_state', 'period': 'factor_period', 'factor_tco2e_per_unit': 'factor'})
+        table['scope'] = table['scope'].astype(int)
+        table['factor'] = table['factor'].astype(float)
+        return cls(table, versions[0], f"{versions[0]}:{content_hash(data)[:12]}")
+
+    def apply(self, activity):
+        """Add scope, factor and emissions_tco2e columns to an activity table.
+
+        activity needs resource, unit, state, period and activity columns.
+        The most specific matching factor wins (state and period over blanks);
+        rows without a factor get scope NaN and zero emissions.
+        """
+        rows = activity.reset_index(drop=True)
+        keys = rows[['resource', 'unit', 'state', 'period']].fillna('')
+        keys['row'] = np.arange(len(rows))
+
+        matches = keys.merge(self.table, on=['resource', 'unit'])
+        state_match = matches['factor_state'] == matches['state']
+        period_match = matches['factor_period'] == matches['period']
+        matches = matches[(state_match | (matches['factor_state'] == ''))
+                          & (period_match | (matches['factor_period'] == ''))]
+        specificity = (matches['factor_state'] != '') * 2 + (matches['factor_period'] != '')
+        best = matches.assign(specificity=specificity).sort_values('specificity') \
+            .drop_duplicates('row', keep='last').set_index('row')
+
+        factor = best['factor'].reindex(keys['row']).fillna(0.0).to_numpy()
+        return rows.assign(
+            scope=best['scope'].reindex(keys['row']).to_numpy(),
+            factor=factor,
+            emissions_tco2e=rows['activity'].to_numpy(dtype=float) * factor,
+        )
+
+    def resolve(self, resource, unit, state='', period=''):
+        """(scope, factor) for one activity key, memoised; scope is None when no factor applies.
+
+        For a handful of values (one site's totals) this avoids the fixed cost of apply().
+        """
+        key = (resource, unit, state or '', period or '')
+        if key not in self._resolved:
+            row = self.apply(pd.DataFrame([dict(zip(FACTOR_KEY, key), activity=0.0)])).iloc[0]
+            self._resolved[key] = (None if pd.isna(row['scope']) else int(row['scope']), float(row['factor']))
+        return self._resolved[key]
+
+
+def load_factors(path=None):
+    """Registry for a factors file, reloaded only when the file changes"""
+    path = path or default_factors_path()
+    mtime = os.path.getmtime(path)
+    cached = _loaded.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, EmissionFactors.from_csv(path))
+        _loaded[path] = cached
+    return cached[1]
@@ -0,0 +1,226 @@
+"""
+ESG Ingestion
+=============
+Parse uploaded workbooks into site KPI records, optionally in parallel.
+Each file's bytes are sent to a worker process; results come back in the
+original upload order and a progress callback fires as each worker finishes.
+This module does not import Streamlit and can be used from scripts.
+"""
+
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+
+from esg_cache import content_hash
+from esg_factors import load_factors
+from esg_sites import load_sites
+from esg_profiling import StageProfile, stage
+from esg_extraction import (portal_site_kpis, read_main_sheet, stream_portal_site_kpis,
+                            stream_sunsure_site_kpis, sunsure_site_kpis)
+
+RECORD_BUILDERS = {
+    'sunsure': lambda main_sheet, file_name, site_name: sunsure_site_kpis(main_sheet, file_name, site_name),
+    'portal': lambda main_sheet, file_name, site_name: portal_site_kpis(main_sheet, site_name),
+}
+STREAMING_BUILDERS = {
+    'sunsure': lambda source, file_name, site_name: stream_sunsure_site_kpis(source, file_name, site_name),
+    'portal': lambda source, file_name, site_name: stream_portal_site_kpis(source, site_name),
+}
+
+DEFAULT_STREAMING_THRESHOLD_MB = 20
+
+
+def default_workers():
+    """Worker count from ESG_INGEST_WORKERS, falling back to the number of CPUs"""
+    try:
+        workers = int(os.environ.get('ESG_INGEST_WORKERS', 0))
+    except ValueError:
+        workers = 0
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def streaming_threshold():
+    """File size in bytes from which the constant-memory streaming reader is used (ESG_STREAMING_THRESHOLD_MB)"""
+    try:
+        megabytes = float(os.environ.get('ESG_STREAMING_THRESHOLD_MB', DEFAULT_STREAMING_THRESHOLD_MB))
+    except ValueError:
+        megabytes = DEFAULT_STREAMING_THRESHOLD_MB
+    return int(megabytes * 1024 * 1024)
+
+
+def create_pool(max_workers):
+    """Process pool using spawn so workers never inherit Streamlit server threads"""
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def file_fingerprint(file_name, data):
+    """(name, size, content hash) identifying one version of an uploaded file"""
+    return file_name, len(data), content_hash(data)
+
+
+def parse_workbook(kind, data, file_name, site_name, streaming=None, profile=False, trace_memory=False):
+    """Worker entry point: return (record, error_message, seconds, stages) for one workbook's bytes.
+
+    Large files (see streaming_threshold) are read row by row instead of
+    being loaded into a DataFrame; both paths give the same record. With
+    profile set, stages holds the StageProfile entries of this file.
+    """
+    if streaming is None:
+        streaming = len(data) >= streaming_threshold()
+    file_profile = StageProfile(file_name, trace_memory)
+    start = time.perf_counter()
+    record, error = None, None
+    with file_profile.activate() if profile else nullcontext():
+        try:
+            if streaming:
+                with stage('stream_extract'):
+                    record = STREAMING_BUILDERS[kind](io.BytesIO(data), file_name, site_name)
+            else:
+                main_sheet = read_main_sheet(io.BytesIO(data))
+                with stage('extract'):
+                    record = RECORD_BUILDERS[kind](main_sheet, file_name, site_name)
+        except Exception as e:
+            error = str(e)
+    return record, error, time.perf_counter() - start, file_profile.entries
+
+
+def ingest_workbooks(jobs, kind, executor=None, cache=None, on_progress=None, on_result=None, cancel_event=None,
+                     profile=False, trace_memory=False):
+    """Parse (data, file_name, site_name) jobs and return (record, error, seconds, stages) in job order.
+
+    Cached records are returned without parsing; they are keyed by the
+    emission factors and site master too, so editing either file
+    invalidates them. Remaining jobs run on the executor when one is
+    given, otherwise on the calling thread. on_result
+    is called with (index, result) as each job finishes. Once cancel_event
+    is set, queued jobs are cancelled and their results are left as None.
+    With profile set, each parsed file returns its per-stage timings.
+    """
+    total = len(jobs)
+    results = [None] * total
+    done = 0
+    pending = []
+    # Records depend on the emission factors and the site master as well as the file
+    factors_key = f"{load_factors().fingerprint}|{load_sites().fingerprint}" if cache is not None else None
+
+    for i, (data, file_name, site_name) in enumerate(jobs):
+        record = cache.get(cache.make_key(data, kind, file_name, site_name, factors_key)) if cache is not None else None
+        if record is not None:
+            results[i] = (record, None, 0.0, [])
+            done += 1
+            if on_result:
+                on_result(i, results[i])
+            if on_progress:
+                on_progress(done, total, file_name)
+        else:
+            pending.append(i)
+
+    def finish(i, result):
+        nonlocal done
+        results[i] = result
+        data, file_name, site_name = jobs[i]
+        if cache is not None and result[0] is not None:
+            cache.put(cache.make_key(data, kind, file_name, site_name, factors_key), result[0])
+        done += 1
+        if on_result:
+            on_result(i, result)
+        if on_progress:
+            on_progress(done, total, file_name)
+
+    def cancelled():
+        return cancel_event is not None and cancel_event.is_set()
+
+    if executor is None or len(pending) <= 1:
+        for i in pending:
+            if cancelled():
+                break
+            finish(i, parse_workbook(kind, *jobs[i], None, profile, trace_memory))
+        return results
+
+    futures = {executor.submit(parse_workbook, kind, *jobs[i], None, profile, trace_memory): i for i in pending}
+    for future in as_completed(futures):
+        if cancelled():
+            for queued in futures:
+                queued.cancel()
+            break
+        try:
+            result = future.result()
+        except Exception as e:
+            # A crashed worker (e.g. out of memory) only fails its own file
+            result = (None, f"worker failed: {e}", 0.0, [])
+        finish(futures[future], result)
+
+    return results
+
+
+class IngestJob:
+    """Runs ingest_workbooks() on a background thread so the page stays responsive.
+
+    Finished records can be read with completed() while the job is running;
+    cancel() stops queued files from being parsed.
+    """
+
+    def __init__(self, jobs, kind, executor=None, cache=None, profile=False, trace_memory=False):
+        self.jobs = jobs
+        self.kind = kind
+        self.executor = executor
+        self.cache = cache
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.total = len(jobs)
+        self.results = [None] * self.total
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._finished = threading.Event()
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _collect(self, index, result):
+        with self._lock:
+            self.results[index] = result
+
+    def _run(self):
+        try:
+            ingest_workbooks(self.jobs, self.kind, executor=self.executor, cache=self.cache,
+                             on_result=self._collect, cancel_event=self._cancel,
+                             profile=self.profile, trace_memory=self.trace_memory)
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.finished_at = time.perf_counter()
+            self._finished.set()
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    @property
+    def done(self):
+        with self._lock:
+            return sum(result is not None for result in self.results)
+
+    def completed(self):
+        """(index, result) pairs for the jobs finished so far"""
+        with self._lock:
+            return [(i, result) for i, result in enumerate(self.results) if result is not None]
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
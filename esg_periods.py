@@ -0,0 +1,121 @@
+"""
+ESG Reporting Periods
+=====================
+Reporting period detection and calendar buckets. A site workbook holds
+January-December columns of one calendar year, so its period is that year
+('2025'); it is read from the file name ('GHG_Data_July-2025', '2025-07')
+or, failing that, from text or dates in the sheet. Monthly values roll up
+into Indian financial-year quarters and years (April-March).
+This module does not import Streamlit.
+"""
+
+import re
+from datetime import date, datetime
+from itertools import islice
+
+import pandas as pd
+
+MONTH_NUMBERS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'sept': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+
+# Month names and their usual abbreviations, as whole words
+MONTH_NAME_PATTERN = (r'(?<![a-z])(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?'
+                      r'|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)(?![a-z])')
+
+# "July-2025", "Jul 2025", "july_25" and "2025-07", "2025_7"
+MONTH_YEAR_RE = re.compile(MONTH_NAME_PATTERN + r'[\s_\-.,\']*((?:19|20)?\d{2})(?![0-9a-z])', re.IGNORECASE)
+YEAR_MONTH_RE = re.compile(r'(?<!\d)((?:19|20)\d{2})[\-_.](0?[1-9]|1[0-2])(?!\d)')
+
+GRAINS = ('month', 'quarter', 'fy')
+
+# Rows of a sheet searched for a period when the file name has none
+SHEET_SCAN_ROWS = 20
+
+# Years earlier than this, or after next year, are taken as other numbers ("Mar 50", "Block 1987")
+MIN_YEAR = 2000
+
+
+def _year(text):
+    year = int(text)
+    return year + 2000 if year < 100 else year
+
+
+def month_number(name):
+    """Month number of a month name or abbreviation ('Sept', 'July')"""
+    return MONTH_NUMBERS[name[:3].lower()]
+
+
+def plausible_year(year):
+    return MIN_YEAR <= year <= date.today().year + 1
+
+
+def detect_period(text):
+    """(year, month) named in a file name or cell text, or None"""
+    text = str(text)
+    for match in MONTH_YEAR_RE.finditer(text):
+        year = _year(match.group(2))
+        if plausible_year(year):
+            return year, month_number(match.group(1))
+    for match in YEAR_MONTH_RE.finditer(text):
+        year = int(match.group(1))
+        if plausible_year(year):
+            return year, int(match.group(2))
+    return None
+
+
+def sheet_period(sheet, max_rows=SHEET_SCAN_ROWS):
+    """(year, month) from the first rows of a sheet: a date cell or text such as 'July 2025'"""
+    return rows_period(sheet.head(max_rows).itertuples(index=False), max_rows)
+
+
+def rows_period(rows, max_rows=SHEET_SCAN_ROWS):
+    """sheet_period() of raw rows (tuples of cell values), e.g. those read while streaming a workbook"""
+    for row in islice(rows, max_rows):
+        for value in row:
+            if isinstance(value, (datetime, date)) and not pd.isna(value):
+                return value.year, value.month
+            if isinstance(value, str):
+                found = detect_period(value)
+                if found:
+                    return found
+    return None
+
+
+def period_key(year):
+    """Store partition key for a calendar year"""
+    return f"{int(year):04d}"
+
+
+def fy_start(year, month):
+    """Calendar year in which the Indian financial year containing (year, month) starts"""
+    return year if month >= 4 else year - 1
+
+
+def fy_label(year, month):
+    start = fy_start(year, month)
+    return f"FY{start}-{(start + 1) % 100:02d}"
+
+
+def quarter_label(year, month):
+    """Financial-year quarter: Q1 is April-June"""
+    return f"{fy_label(year, month)} Q{(month - 4) % 12 // 3 + 1}"
+
+
+def month_label(year, month):
+    return f"{year:04d}-{month:02d}"
+
+
+def period_buckets(periods):
+    """Month, quarter and financial-year bucket of each month of the given period keys.
+
+    Returns a frame with columns period, month, month_bucket, quarter and fy;
+    blank (undated) periods are left out.
+    """
+    rows = [
+        (period, month, month_label(int(period), month), quarter_label(int(period), month), fy_label(int(period), month))
+        for period in sorted(set(periods)) if period
+        for month in range(1, 13)
+    ]
+    return pd.DataFrame(rows, columns=['period', 'month', 'month_bucket', 'quarter', 'fy'])
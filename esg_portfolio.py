@@ -0,0 +1,262 @@
+"""
+ESG Portfolio Tensor
+====================
+The extracted portfolio as dense float arrays of shape
+(sites, resources, 12 months) for activity and emissions, with index maps
+for site, state and technology. Totals, state rollups, intensities and
+monthly trends are array reductions over these arrays; the record-shaped
+DataFrame is only built for display and exports.
+This module does not import Streamlit.
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from esg_extraction import MONTHS, RESOURCE_UNITS
+from esg_factors import load_factors
+from esg_records import RESOURCE_FIELDS, sunsure_arrays
+
+RESOURCES = list(RESOURCE_FIELDS)
+RESOURCE_INDEX = {resource: r for r, resource in enumerate(RESOURCES)}
+SCOPES = (1, 2, 3)
+
+PORTFOLIO_COLUMNS = ['Site_Name', 'State', 'Capacity_MW', 'Technology',
+                     'Water_Total', 'Diesel_Total', 'Electricity_Total', 'Cement_Total',
+                     'Water_Monthly', 'Diesel_Monthly', 'Elec_Monthly', 'Cement_Monthly',
+                     'GHG_Total_Scope1', 'GHG_Total_Scope2', 'GHG_Total_Scope3', 'GHG_Total']
+
+
+class PortfolioTensor:
+    def __init__(self, site_names, states, technologies, capacity, activity, emissions, scopes):
+        self.site_names = np.asarray(site_names, dtype=object)
+        self.site_index = {name: i for i, name in enumerate(self.site_names)}
+        self.state_codes, self.state_labels = pd.factorize(np.asarray(states, dtype=object), sort=True)
+        self.tech_codes, self.tech_labels = pd.factorize(np.asarray(technologies, dtype=object), sort=True)
+        self.capacity = np.asarray(capacity, dtype=float)
+        # (sites, resources, months) activity and tCO2e; scope of each (site, resource), 0 for none
+        self.activity = np.asarray(activity, dtype=float).reshape(len(self.site_names), len(RESOURCES), len(MONTHS))
+        self.emissions = np.asarray(emissions, dtype=float).reshape(self.activity.shape)
+        self.scopes = np.asarray(scopes, dtype=np.int8).reshape(self.activity.shape[:2])
+
+    def __len__(self):
+        return len(self.site_names)
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], [], [], np.zeros((0, len(RESOURCES), len(MONTHS))),
+                   np.zeros((0, len(RESOURCES), len(MONTHS))), np.zeros((0, len(RESOURCES))))
+
+    @classmethod
+    def from_records(cls, records, factors=None, period=''):
+        """Tensor of SunsureKPIRecords, with emissions from the factor registry.
+
+        period applies to records without a period of their own.
+        """
+        if not records:
+            return cls.empty()
+        activity, _ = sunsure_arrays(records)
+        states = [record.state for record in records]
+
+        # One factor lookup per (site, resource), for each record's own reporting period
+        lookup = pd.DataFrame({
+            'resource': np.tile(RESOURCES, len(records)),
+            'state': np.repeat(states, len(RESOURCES)),
+            'period': np.repeat([record.period or period for record in records], len(RESOURCES)),
+            'activity': 0.0,
+        })
+        lookup['unit'] = lookup['resource'].map(RESOURCE_UNITS)
+        lookup = (factors or load_factors()).apply(lookup)
+        factor = lookup['factor'].to_numpy().reshape(len(records), len(RESOURCES))
+        scopes = lookup['scope'].fillna(0).to_numpy().reshape(len(records), len(RESOURCES))
+
+        return cls([record.site_name for record in records], states,
+                   [record.technology for record in records], [record.capacity for record in records],
+                   activity, activity * factor[:, :, None], scopes)
+
+    @classmethod
+    def from_facts(cls, facts, site_names=None):
+        """Tensor of stored fact rows (site_name, state, capacity_mw, technology, resource, month, activity, scope,
+        emissions_tco2e), in site_names order when given"""
+        sites = facts.drop_duplicates('site_name').set_index('site_name')
+        order = list(site_names) if site_names is not None else sorted(sites.index)
+        order = [name for name in order if name in sites.index]
+        sites = sites.loc[order]
+
+        index = {name: i for i, name in enumerate(order)}
+        facts = facts[facts['site_name'].isin(index) & facts['resource'].isin(RESOURCE_INDEX)]
+        s = facts['site_name'].map(index).to_numpy(dtype=int)
+        r = facts['resource'].map(RESOURCE_INDEX).to_numpy(dtype=int)
+        m = facts['month'].to_numpy(dtype=int) - 1
+
+        shape = (len(order), len(RESOURCES), len(MONTHS))
+        activity, emissions, scopes = np.zeros(shape), np.zeros(shape), np.zeros(shape[:2])
+        activity[s, r, m] = facts['activity'].to_numpy(dtype=float)
+        emissions[s, r, m] = facts['emissions_tco2e'].to_numpy(dtype=float)
+        scopes[s, r] = facts['scope'].fillna(0).to_numpy()
+
+        return cls(order, sites['state'].to_numpy(), sites['technology'].to_numpy(),
+                   sites['capacity_mw'].to_numpy(), activity, emissions, scopes)
+
+    def take(self, site_names):
+        """Sub-portfolio of the given sites, in that order; unknown names are skipped"""
+        idx = np.array([self.site_index[name] for name in site_names if name in self.site_index], dtype=int)
+        return PortfolioTensor(self.site_names[idx], self.state_labels[self.state_codes[idx]],
+                               self.tech_labels[self.tech_codes[idx]], self.capacity[idx],
+                               self.activity[idx], self.emissions[idx], self.scopes[idx])
+
+    @classmethod
+    def concat(cls, tensors):
+        tensors = [tensor for tensor in tensors if len(tensor)]
+        if not tensors:
+            return cls.empty()
+        return cls(np.concatenate([t.site_names for t in tensors]),
+                   np.concatenate([t.state_labels[t.state_codes] for t in tensors]),
+                   np.concatenate([t.tech_labels[t.tech_codes] for t in tensors]),
+                   np.concatenate([t.capacity for t in tensors]),
+                   np.concatenate([t.activity for t in tensors]),
+                   np.concatenate([t.emissions for t in tensors]),
+                   np.concatenate([t.scopes for t in tensors]))
+
+    def fingerprint(self):
+        """Hex digest of the tensor's contents, for keying cached exports"""
+        digest = hashlib.sha256()
+        for labels in (self.site_names, self.state_labels, self.tech_labels):
+            digest.update('\x1f'.join(map(str, labels)).encode() + b'\x1e')
+        for array in (self.state_codes, self.tech_codes, self.capacity, self.activity, self.emissions, self.scopes):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    # Reductions
+
+    def resource_totals(self):
+        """(sites, resources) annual activity"""
+        return self.activity.sum(axis=2)
+
+    def scope_totals(self):
+        """(sites, 3) annual tCO2e for scopes 1-3"""
+        site_emissions = self.emissions.sum(axis=2)
+        return np.stack([(site_emissions * (self.scopes == scope)).sum(axis=1) for scope in SCOPES], axis=1)
+
+    def ghg_totals(self):
+        return self.scope_totals().sum(axis=1)
+
+    def portfolio_totals(self):
+        """Portfolio-wide totals for the summary cards"""
+        totals = self.activity.sum(axis=(0, 2))
+        return {
+            'sites': len(self),
+            'capacity': self.capacity.sum(),
+            **{resource: totals[r] for r, resource in enumerate(RESOURCES)},
+            'ghg': self.emissions.sum(),
+        }
+
+    def state_summary(self):
+        """State-wise totals, same columns and order as esg_reports.summarize_states"""
+        n_states = len(self.state_labels)
+        totals = self.resource_totals()
+
+        def by_state(values):
+            return np.bincount(self.state_codes, weights=values, minlength=n_states)
+
+        return pd.DataFrame({
+            'State': np.asarray(self.state_labels, dtype=object),
+            'Capacity_MW': by_state(self.capacity),
+            'Water_Total': by_state(totals[:, RESOURCE_INDEX['water']]),
+            'Diesel_Total': by_state(totals[:, RESOURCE_INDEX['diesel']]),
+            'GHG_Total': by_state(self.ghg_totals()),
+            'Num_Sites': np.bincount(self.state_codes, minlength=n_states),
+        })
+
+    def intensities(self):
+        """Per-site emissions, water and diesel per MW of capacity"""
+        capacity = np.where(self.capacity > 0, self.capacity, np.nan)
+        totals = self.resource_totals()
+        return pd.DataFrame({
+            'Site_Name': self.site_names,
+            'GHG_per_MW': self.ghg_totals() / capacity,
+            'Water_per_MW': totals[:, RESOURCE_INDEX['water']] / capacity,
+            'Diesel_per_MW': totals[:, RESOURCE_INDEX['diesel']] / capacity,
+        })
+
+    def monthly_emissions(self):
+        """(12,) portfolio tCO2e by month"""
+        return self.emissions.sum(axis=(0, 1))
+
+    def monthly_activity(self, resource):
+        """(12,) portfolio activity of one resource by month"""
+        return self.activity[:, RESOURCE_INDEX[resource]].sum(axis=0)
+
+    def site_views(self, group_names=None):
+        """Per-site view dicts keyed by site, for the site pages.
+
+        group_names gives each tensor site the site it belongs to (for
+        example its site master name); several files of one site are summed.
+        Each view holds the KPI card values, the monthly GHG series, monthly
+        activity per resource and per-MW intensities as plain numbers.
+        """
+        names = list(self.site_names) if group_names is None else list(group_names)
+        codes, groups = pd.factorize(np.asarray(names, dtype=object))
+        n_groups = len(groups)
+
+        activity = np.zeros((n_groups,) + self.activity.shape[1:])
+        np.add.at(activity, codes, self.activity)
+        scope_totals = np.zeros((n_groups, len(SCOPES)))
+        np.add.at(scope_totals, codes, self.scope_totals())
+        monthly_ghg = np.zeros((n_groups, len(MONTHS)))
+        np.add.at(monthly_ghg, codes, self.emissions.sum(axis=1))
+        # Capacity, state and technology come from a site's first file
+        first = np.unique(codes, return_index=True)[1]
+        files = [[] for _ in range(n_groups)]
+        for site, g in zip(self.site_names, codes):
+            files[g].append(str(site))
+
+        views = {}
+        totals = activity.sum(axis=2)
+        for g, name in enumerate(groups):
+            i = first[g]
+            capacity = float(self.capacity[i])
+            ghg = float(scope_totals[g].sum())
+            resource_totals = {resource: float(totals[g, r]) for r, resource in enumerate(RESOURCES)}
+            per_mw = (lambda value: value / capacity) if capacity > 0 else (lambda value: float('nan'))
+            views[name] = {
+                'files': files[g],
+                'state': str(self.state_labels[self.state_codes[i]]),
+                'technology': str(self.tech_labels[self.tech_codes[i]]),
+                'capacity': capacity,
+                'kpis': {
+                    **{f'scope{scope}': float(scope_totals[g, k]) for k, scope in enumerate(SCOPES)},
+                    'ghg': ghg,
+                    **resource_totals,
+                },
+                'monthly_ghg': monthly_ghg[g].tolist(),
+                'monthly': {resource: activity[g, r].tolist() for r, resource in enumerate(RESOURCES)},
+                'intensity': {
+                    'ghg_per_mw': per_mw(ghg),
+                    'water_per_mw': per_mw(resource_totals['water']),
+                    'diesel_per_mw': per_mw(resource_totals['diesel']),
+                },
+            }
+        return views
+
+    def to_frame(self):
+        """Record-shaped DataFrame (one row per site, monthly lists) for display and exports.
+
+        State and Technology are categoricals over the tensor's own codes, so they are not copied out per site.
+        """
+        df = pd.DataFrame({
+            'Site_Name': self.site_names,
+            'State': pd.Categorical.from_codes(self.state_codes, categories=self.state_labels),
+            'Capacity_MW': self.capacity,
+            'Technology': pd.Categorical.from_codes(self.tech_codes, categories=self.tech_labels),
+        })
+        totals = self.resource_totals()
+        for r, (monthly_field, total_field) in enumerate(RESOURCE_FIELDS.values()):
+            df[total_field] = totals[:, r]
+            df[monthly_field] = self.activity[:, r].tolist()
+        scopes = self.scope_totals()
+        for i, scope in enumerate(SCOPES):
+            df[f'GHG_Total_Scope{scope}'] = scopes[:, i]
+        df['GHG_Total'] = df['GHG_Total_Scope1'] + df['GHG_Total_Scope2'] + df['GHG_Total_Scope3']
+        return df[PORTFOLIO_COLUMNS]
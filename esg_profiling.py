@@ -0,0 +1,162 @@
+"""
+ESG Profiling
+=============
+Per-stage instrumentation of portfolio runs: wall time, CPU time and
+(optionally) peak Python memory for each stage and file. Library code marks
+its stages with stage(), which only records while a StageProfile is active
+on the current thread, so it costs nothing in normal runs. Entries can be
+summarised per stage, ranked by file and appended to a JSON lines log.
+tracemalloc is process-wide: it runs while any profile that traces memory
+is active, and peak memory is only reported for stages that ran while no
+other thread was tracing. This module does not import Streamlit.
+"""
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+import pandas as pd
+
+DEFAULT_PROFILE_LOG = 'esg_profile.jsonl'
+
+_local = threading.local()
+
+# Threads with an active memory-tracing profile, and a count of tracing starts so
+# a stage can tell whether another thread traced (and reset the peak) meanwhile
+_tracing_lock = threading.Lock()
+_tracing = {'threads': 0, 'starts': 0, 'owned': False}
+
+
+def default_profile_log():
+    return os.environ.get('ESG_PROFILE_LOG') or DEFAULT_PROFILE_LOG
+
+
+def _start_tracing():
+    with _tracing_lock:
+        if _tracing['threads'] == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing['owned'] = True
+        _tracing['threads'] += 1
+        _tracing['starts'] += 1
+
+
+def _stop_tracing():
+    with _tracing_lock:
+        _tracing['threads'] -= 1
+        if _tracing['threads'] == 0 and _tracing['owned']:
+            tracemalloc.stop()
+            _tracing['owned'] = False
+
+
+def _sole_tracer():
+    """Tracing start count when this thread is the only one tracing, else None"""
+    with _tracing_lock:
+        return _tracing['starts'] if _tracing['threads'] == 1 and tracemalloc.is_tracing() else None
+
+
+class StageProfile:
+    """Collects one entry per timed stage: stage, file, wall_s, cpu_s, peak_mb.
+
+    Stages should not be nested when memory is traced: each stage resets
+    the tracemalloc peak. peak_mb is None for stages that overlapped memory
+    tracing on another thread, whose peak resets and allocations would mix
+    with this stage's.
+    """
+
+    def __init__(self, file_name=None, trace_memory=False):
+        self.file_name = file_name
+        self.trace_memory = trace_memory
+        self.entries = []
+        self.run_id = uuid.uuid4().hex[:12]
+
+    @contextmanager
+    def stage(self, name, file_name=None, trace_memory=True):
+        tracing = _sole_tracer() if trace_memory and self.trace_memory else None
+        if tracing is not None:
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            self.entries.append({
+                'stage': name,
+                'file': file_name or self.file_name,
+                'wall_s': time.perf_counter() - wall,
+                'cpu_s': time.thread_time() - cpu,
+                'peak_mb': ((tracemalloc.get_traced_memory()[1] - base) / 1e6
+                            if tracing is not None and _sole_tracer() == tracing else None),
+            })
+
+    def add(self, entries):
+        """Merge entries recorded elsewhere, e.g. returned by a worker process"""
+        self.entries.extend(entries)
+
+    @contextmanager
+    def activate(self):
+        """Make this the profile stage() records into on the current thread"""
+        previous = getattr(_local, 'profile', None)
+        # Nested profiles on one thread trace as one: count the thread once
+        tracing = self.trace_memory and not getattr(_local, 'tracing', False)
+        if tracing:
+            _start_tracing()
+            _local.tracing = True
+        _local.profile = self
+        try:
+            yield self
+        finally:
+            _local.profile = previous
+            if tracing:
+                _local.tracing = False
+                _stop_tracing()
+
+    def stage_summary(self):
+        """Totals per stage, in the order stages first ran"""
+        if not self.entries:
+            return pd.DataFrame(columns=['stage', 'calls', 'wall_s', 'cpu_s', 'peak_mb'])
+        entries = pd.DataFrame(self.entries)
+        return entries.groupby('stage', sort=False).agg(
+            calls=('wall_s', 'size'), wall_s=('wall_s', 'sum'), cpu_s=('cpu_s', 'sum'), peak_mb=('peak_mb', 'max')
+        ).reset_index()
+
+    def slowest_files(self, n=10):
+        """The n files with the most total wall time across their stages"""
+        entries = pd.DataFrame(self.entries, columns=['stage', 'file', 'wall_s', 'cpu_s', 'peak_mb'])
+        entries = entries[entries['file'].notna()]
+        if entries.empty:
+            return pd.DataFrame(columns=['file', 'wall_s', 'cpu_s', 'peak_mb', 'slowest_stage'])
+        slowest_stage = entries.loc[entries.groupby('file')['wall_s'].idxmax(), ['file', 'stage']]
+        files = entries.groupby('file').agg(wall_s=('wall_s', 'sum'), cpu_s=('cpu_s', 'sum'), peak_mb=('peak_mb', 'max'))
+        files = files.join(slowest_stage.set_index('file')['stage'].rename('slowest_stage'))
+        return files.sort_values('wall_s', ascending=False).head(n).reset_index()
+
+    def write_jsonl(self, path=None, **run_fields):
+        """Append every entry as one JSON line tagged with the run id and run_fields; returns the path"""
+        path = path or default_profile_log()
+        timestamp = datetime.now().isoformat(timespec='seconds')
+        with open(path, 'a') as f:
+            for entry in self.entries:
+                f.write(json.dumps({'run_id': self.run_id, 'timestamp': timestamp, **run_fields, **entry}) + '\n')
+        return path
+
+
+def activated(profile):
+    """profile.activate(), or a no-op context when profile is None (profiling off)"""
+    return nullcontext() if profile is None else profile.activate()
+
+
+@contextmanager
+def stage(name, file_name=None, trace_memory=True):
+    """Time a block into the profile active on this thread; a no-op when none is"""
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        yield
+        return
+    with profile.stage(name, file_name, trace_memory):
+        yield
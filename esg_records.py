@@ -0,0 +1,163 @@
+"""
+ESG Site KPI Records
+====================
+Compact per-site KPI records. A Sunsure record keeps its twelve months of
+water, diesel, electricity and cement and its scope 1-3 emissions in one
+contiguous float64 buffer, read as a (4, 12) monthly array and a (3,)
+scope array; a portal record keeps all of its figures in one float64 row. Both are slotted (no per-record
+dict) and still read like the dicts they replace (record['GHG_Total'],
+record.get('Period'), record.items()). Many records stack into arrays or a
+DataFrame in one step instead of being unpacked field by field.
+This module does not import Streamlit.
+"""
+
+from operator import attrgetter
+
+import numpy as np
+import pandas as pd
+
+# Resources of a Sunsure record, in array order, with their monthly and total fields
+RESOURCE_FIELDS = {
+    'water': ('Water_Monthly', 'Water_Total'),
+    'diesel': ('Diesel_Monthly', 'Diesel_Total'),
+    'electricity': ('Elec_Monthly', 'Electricity_Total'),
+    'cement': ('Cement_Monthly', 'Cement_Total'),
+}
+SCOPE_FIELDS = ('GHG_Total_Scope1', 'GHG_Total_Scope2', 'GHG_Total_Scope3')
+MONTH_COUNT = 12
+MONTHLY_SIZE = len(RESOURCE_FIELDS) * MONTH_COUNT
+
+# Portal record figures, in row order (and DataFrame column order after Site_Name and Report_Date)
+PORTAL_VALUES = ('Diesel_Consumption_Liters', 'Water_Consumption_Liters', 'Concrete_Usage_Tons', 'Steel_Usage_Tons',
+                 'Scope1_Emissions_tCO2e', 'Scope3_Materials_tCO2e', 'Total_Emissions_tCO2e', 'Site_Capacity_MW',
+                 'Emission_Intensity_tCO2e_per_MW', 'Water_Intensity_L_per_MW', 'Fuel_Intensity_L_per_MW')
+
+
+class KPIRecord:
+    """Read-only mapping view of a slotted record: COLUMNS in order, each read through _GETTERS"""
+    __slots__ = ()
+    COLUMNS = ()
+    _GETTERS = {}
+
+    def __getitem__(self, column):
+        getter = self._GETTERS.get(column)
+        if getter is None:
+            raise KeyError(column)
+        return getter(self)
+
+    def get(self, column, default=None):
+        getter = self._GETTERS.get(column)
+        return default if getter is None else getter(self)
+
+    def __contains__(self, column):
+        return column in self._GETTERS
+
+    def __iter__(self):
+        return iter(self.COLUMNS)
+
+    def keys(self):
+        return list(self.COLUMNS)
+
+    def values(self):
+        return [self[column] for column in self.COLUMNS]
+
+    def items(self):
+        return list(zip(self.COLUMNS, self.values()))
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.site_name!r})"
+
+
+class SunsureKPIRecord(KPIRecord):
+    __slots__ = ('site_name', 'state', 'capacity', 'technology', 'period', 'data')
+    COLUMNS = ('Site_Name', 'State', 'Capacity_MW', 'Technology',
+               *(total for _, total in RESOURCE_FIELDS.values()),
+               *(monthly for monthly, _ in RESOURCE_FIELDS.values()),
+               *SCOPE_FIELDS, 'GHG_Total', 'Period')
+
+    def __init__(self, site_name, state, capacity, technology, monthly, scopes, period=''):
+        self.site_name = site_name
+        self.state = state
+        self.capacity = capacity
+        self.technology = technology
+        self.period = period
+        # Activity by resource (RESOURCE_FIELDS order) and month, then tCO2e for scopes 1-3
+        self.data = np.empty(MONTHLY_SIZE + len(SCOPE_FIELDS))
+        self.data[:MONTHLY_SIZE] = np.ravel(monthly)
+        self.data[MONTHLY_SIZE:] = scopes
+
+    @property
+    def monthly(self):
+        """(resources, 12) activity, a view of the record's buffer"""
+        return self.data[:MONTHLY_SIZE].reshape(len(RESOURCE_FIELDS), MONTH_COUNT)
+
+    @property
+    def scopes(self):
+        return self.data[MONTHLY_SIZE:]
+
+    def ghg_total(self):
+        scope1, scope2, scope3 = self.scopes.tolist()
+        return scope1 + scope2 + scope3
+
+
+def _sunsure_getters():
+    getters = {
+        'Site_Name': attrgetter('site_name'), 'State': attrgetter('state'),
+        'Capacity_MW': attrgetter('capacity'), 'Technology': attrgetter('technology'),
+        'GHG_Total': SunsureKPIRecord.ghg_total, 'Period': attrgetter('period'),
+    }
+    for r, (monthly, total) in enumerate(RESOURCE_FIELDS.values()):
+        getters[monthly] = lambda record, r=r: record.monthly[r].tolist()
+        getters[total] = lambda record, r=r: float(record.monthly[r].sum())
+    for k, field in enumerate(SCOPE_FIELDS):
+        getters[field] = lambda record, k=k: float(record.scopes[k])
+    return getters
+
+
+SunsureKPIRecord._GETTERS = _sunsure_getters()
+
+
+class PortalKPIRecord(KPIRecord):
+    __slots__ = ('site_name', 'report_date', 'figures')
+    COLUMNS = ('Site_Name', 'Report_Date', *PORTAL_VALUES)
+
+    def __init__(self, site_name, report_date, figures):
+        self.site_name = site_name
+        self.report_date = report_date
+        self.figures = np.asarray(figures, dtype=np.float64).reshape(len(PORTAL_VALUES))
+
+    @classmethod
+    def missing(cls, site_name, report_date):
+        """Record of a site whose figures could not be extracted (all NaN)"""
+        return cls(site_name, report_date, np.full(len(PORTAL_VALUES), np.nan))
+
+    def values(self):
+        return [self.site_name, self.report_date, *self.figures.tolist()]
+
+
+def _portal_getters():
+    getters = {'Site_Name': attrgetter('site_name'), 'Report_Date': attrgetter('report_date')}
+    for k, field in enumerate(PORTAL_VALUES):
+        getters[field] = lambda record, k=k: float(record.figures[k])
+    return getters
+
+
+PortalKPIRecord._GETTERS = _portal_getters()
+
+
+def sunsure_arrays(records):
+    """(sites, resources, 12) activity and (sites, 3) scope emissions of Sunsure records, stacked once"""
+    data = np.stack([record.data for record in records]) if records else np.zeros((0, MONTHLY_SIZE + len(SCOPE_FIELDS)))
+    return data[:, :MONTHLY_SIZE].reshape(len(data), len(RESOURCE_FIELDS), MONTH_COUNT), data[:, MONTHLY_SIZE:]
+
+
+def portal_frame(records):
+    """DataFrame of portal records: the figures are one stacked float64 block, wrapped without a further copy"""
+    block = np.stack([record.figures for record in records]) if records else np.zeros((0, len(PORTAL_VALUES)))
+    df = pd.DataFrame(block, columns=list(PORTAL_VALUES), copy=False)
+    df.insert(0, 'Site_Name', [record.site_name for record in records])
+    df.insert(1, 'Report_Date', [record.report_date for record in records])
+    return df
@@ -0,0 +1,258 @@
+"""
+ESG Reports
+===========
+Portfolio aggregation and export payloads shared by the Sunsure dashboard
+and the batch CLI. Workbooks are written row by row with xlsxwriter, in
+constant-memory mode once they are large. The dashboards build payloads only
+when a download is requested, through an ExportCache keyed by a hash of the
+exported data. Report bundles stream a portfolio workbook and one workbook
+per site into a ZIP archive on disk, member by member, and are cached as a
+handle to that file rather than as bytes. This module does not import
+Streamlit or Plotly.
+"""
+
+import hashlib
+import io
+import math
+import os
+import re
+import tempfile
+import threading
+import weakref
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+import pandas as pd
+import xlsxwriter
+
+PORTFOLIO_REPORT_NAME = "Sunsure_ESG_Portfolio_Report.xlsx"
+STATE_ANALYSIS_NAME = "Sunsure_State_Analysis.csv"
+EXECUTIVE_SUMMARY_NAME = "Sunsure_Executive_Summary.csv"
+
+# Workbooks with more rows than this are written in xlsxwriter's constant_memory
+# mode, which flushes each row to a temporary file instead of keeping every cell
+CONSTANT_MEMORY_ROWS = 5000
+
+DEFAULT_EXPORT_ENTRIES = 32
+
+# Bundles with fewer sites are built on the calling thread; pool start-up costs more
+BUNDLE_PARALLEL_SITES = 20
+
+
+def summarize_states(df):
+    """State-wise totals of a portfolio frame"""
+    return df.groupby('State').agg({
+        'Capacity_MW': 'sum',
+        'Water_Total': 'sum',
+        'Diesel_Total': 'sum',
+        'GHG_Total': 'sum',
+        'Site_Name': 'count'
+    }).reset_index().rename(columns={'Site_Name': 'Num_Sites'})
+
+
+def executive_summary(df):
+    """One-row executive summary of a portfolio frame"""
+    return pd.DataFrame([{
+        "Portfolio Sites": len(df),
+        "Total Capacity (MW)": df['Capacity_MW'].sum(),
+        "Total Water (Litres)": df['Water_Total'].sum(),
+        "Total Diesel (Litres)": df['Diesel_Total'].sum(),
+        "Total GHG Emissions (tCO2e)": df['GHG_Total'].sum()
+    }])
+
+
+def _cell(value):
+    # Monthly series are written as their list text, as DataFrame.to_excel does
+    if isinstance(value, (list, tuple)):
+        return str(list(value))
+    # xlsxwriter rejects NaN and inf; they are written as blank cells
+    if value is None or (isinstance(value, float) and not math.isfinite(value)):
+        return None
+    return value
+
+
+def write_sheet(workbook, sheet_name, df):
+    """Write a frame (header and values, no index) one row at a time"""
+    sheet = workbook.add_worksheet(sheet_name)
+    sheet.write_row(0, 0, [str(column) for column in df.columns])
+    columns = [[_cell(value) for value in df[column].tolist()] for column in df.columns]
+    for r, row in enumerate(zip(*columns), start=1):
+        sheet.write_row(r, 0, row)
+
+
+def excel_workbook(sheets):
+    """Workbook bytes for {sheet name: frame}, constant-memory when the sheets are large"""
+    output = io.BytesIO()
+    large = sum(len(df) for df in sheets.values()) > CONSTANT_MEMORY_ROWS
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': large, 'in_memory': not large})
+    for sheet_name, df in sheets.items():
+        write_sheet(workbook, sheet_name, df)
+    workbook.close()
+    return output.getvalue()
+
+
+def portfolio_workbook(df, state_summary):
+    """Excel report with the Portfolio_KPIs and State_Summary sheets, as bytes"""
+    return excel_workbook({'Portfolio_KPIs': df, 'State_Summary': state_summary})
+
+
+# Payload builders by download name, each taking (df, state_summary)
+EXPORT_BUILDERS = {
+    PORTFOLIO_REPORT_NAME: portfolio_workbook,
+    STATE_ANALYSIS_NAME: lambda df, state_summary: state_summary.to_csv(index=False),
+    EXECUTIVE_SUMMARY_NAME: lambda df, state_summary: executive_summary(df).to_csv(index=False),
+}
+
+
+def build_exports(df, state_summary):
+    """All portfolio downloads as {file name: payload}"""
+    return {name: build(df, state_summary) for name, build in EXPORT_BUILDERS.items()}
+
+
+def frame_fingerprint(*frames):
+    """Hex digest of the contents of one or more frames, for keying cached exports"""
+    digest = hashlib.sha256()
+    for df in frames:
+        digest.update('|'.join(map(str, df.columns)).encode())
+        # List cells (monthly series) are not hashable; hash them as tuples
+        hashable = df.apply(lambda column: column.map(lambda v: tuple(v) if isinstance(v, list) else v)
+                            if column.dtype == object else column)
+        digest.update(pd.util.hash_pandas_object(hashable, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class ExportCache:
+    """LRU of built download payloads keyed by (data key, file name).
+
+    Download callables run on their own threads, so lookups are locked.
+    Payloads are built outside the lock, so one slow workbook does not hold
+    up other downloads; a payload is still built at most once per key, as
+    a second request for a key being built waits for that build.
+    """
+
+    def __init__(self, max_entries=DEFAULT_EXPORT_ENTRIES):
+        self.max_entries = max(1, int(max_entries))
+        self._payloads = OrderedDict()
+        self._building = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, file_name, build):
+        """Cached payload for (key, file_name), calling build() to create it on a miss"""
+        cache_key = (key, file_name)
+        with self._lock:
+            if cache_key in self._payloads:
+                self._payloads.move_to_end(cache_key)
+                self.hits += 1
+                return self._payloads[cache_key]
+            pending = self._building.get(cache_key)
+            if pending is None:
+                self.misses += 1
+                self._building[cache_key] = building = Future()
+            else:
+                self.hits += 1
+        if pending is not None:
+            return pending.result()
+
+        try:
+            payload = build()
+        except BaseException as exc:
+            with self._lock:
+                del self._building[cache_key]
+            building.set_exception(exc)
+            raise
+        with self._lock:
+            del self._building[cache_key]
+            self._payloads[cache_key] = payload
+            while len(self._payloads) > self.max_entries:
+                self._payloads.popitem(last=False)
+        building.set_result(payload)
+        return payload
+
+    def __len__(self):
+        return len(self._payloads)
+
+
+def site_workbook(record):
+    """Detail workbook for one site's KPI record (a Site_KPIs sheet of metric/value rows), as bytes"""
+    return excel_workbook({'Site_KPIs': pd.DataFrame({'Metric': list(record), 'Value': list(record.values())})})
+
+
+def site_file_name(site_name, used):
+    """File-system safe, unique member name for a site workbook"""
+    stem = re.sub(r'[^\w\-. ]+', '_', str(site_name)).strip(' .') or 'site'
+    name, n = f"{stem}.xlsx", 1
+    while name.lower() in used:
+        n += 1
+        name = f"{stem}_{n}.xlsx"
+    used.add(name.lower())
+    return name
+
+
+def _in_order(executor, build, items, window):
+    # Like executor.map, but with at most `window` results pending, so finished
+    # workbooks never pile up in memory ahead of the archive writer
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(build, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def write_report_bundle(fileobj, portfolio_name, sheets, site_records, executor=None, window=8, sites_dir='sites'):
+    """Write a ZIP of the portfolio workbook ({sheet name: frame}) and one workbook per site record.
+
+    Each member is compressed into fileobj as soon as it is built. Site
+    workbooks are built on the executor (for example esg_ingest.create_pool)
+    when one is given and the bundle is large enough to benefit, with at
+    most `window` finished workbooks waiting to be written.
+    """
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+        bundle.writestr(portfolio_name, excel_workbook(sheets))
+        if executor is not None and len(site_records) >= BUNDLE_PARALLEL_SITES:
+            workbooks = _in_order(executor, site_workbook, site_records, window)
+        else:
+            workbooks = map(site_workbook, site_records)
+        used = set()
+        for record, workbook in zip(site_records, workbooks):
+            bundle.writestr(f"{sites_dir}/{site_file_name(record.get('Site_Name'), used)}", workbook)
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class BundleFile:
+    """A report bundle on disk; the file is deleted once the handle is no longer referenced"""
+
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+        weakref.finalize(self, _remove_file, path)
+
+    def open(self):
+        return open(self.path, 'rb')
+
+    def read(self):
+        """Bundle bytes, read from disk for one download"""
+        with self.open() as f:
+            return f.read()
+
+
+def report_bundle(portfolio_name, sheets, site_records, executor=None):
+    """Bundle written to a temporary file, as a BundleFile; the archive is never held in memory"""
+    fd, path = tempfile.mkstemp(prefix='esg_bundle_', suffix='.zip')
+    try:
+        with os.fdopen(fd, 'wb') as spool:
+            write_report_bundle(spool, portfolio_name, sheets, site_records, executor)
+    except BaseException:
+        _remove_file(path)
+        raise
+    return BundleFile(path)
@@ -0,0 +1,162 @@
+"""
+ESG Template Schemas
+====================
+Where a site workbook keeps its activity description, unit and
+January-December columns. The header row is found by looking for a row
+that names all twelve months (as dates or month names), and the columns
+are read from it. Detection runs once per template: its schema is cached
+under a fingerprint of the sheet's top rows (which month each month date
+or name is, which cells are description or unit labels, which hold other
+text), so later files with the same header layout reuse it after a scan
+of the header cells. Sheets without a recognisable
+header fall back to the original layout (description in column 2, months
+in columns 5-16). This module does not import Streamlit.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import date, datetime
+
+import pandas as pd
+
+from esg_periods import MONTH_NAME_PATTERN, month_number
+
+# Positions are 0-based sheet columns; header_row is the 0-based sheet row, None when not detected
+TemplateSchema = namedtuple('TemplateSchema', ['header_row', 'description_col', 'unit_col', 'month_cols'])
+
+DEFAULT_SCHEMA = TemplateSchema(None, 2, 4, tuple(range(5, 17)))
+
+# Rows searched for the header; the fingerprint stops at the first row naming all twelve months
+SCHEMA_SCAN_ROWS = 30
+DEFAULT_SCHEMA_ENTRIES = 256
+
+# "Jan", "January", "Sept", "Jan-25"
+MONTH_NAME_RE = re.compile(r'\s*' + MONTH_NAME_PATTERN, re.IGNORECASE)
+DESCRIPTION_HEADERS = ('consumption', 'description', 'activity', 'particular', 'source', 'item')
+UNIT_HEADERS = ('unit', 'uom')
+
+
+def _is_date(value):
+    return isinstance(value, (datetime, date)) and value is not pd.NaT
+
+
+def _month(value):
+    if _is_date(value):
+        return value.month
+    if isinstance(value, str):
+        match = MONTH_NAME_RE.match(value)
+        if match:
+            return month_number(match.group(1))
+    return None
+
+
+def _kind(value):
+    """Layout token of one cell: 'm' and its month, the header keywords a label holds, 't' for other text"""
+    month = _month(value)
+    if month is not None:
+        return f"m{month}"
+    if isinstance(value, str) and value.strip():
+        label = value.strip().lower()
+        return '+'.join(key for key in DESCRIPTION_HEADERS + UNIT_HEADERS if key in label) or 't'
+    return ''
+
+
+def header_layout(rows, max_rows=SCHEMA_SCAN_ROWS):
+    """(header block, layout fingerprint) of a sheet's top rows.
+
+    The block runs up to and including the first row that names all twelve
+    months, so a banner row above the header does not cut it short. The
+    fingerprint is a hex digest of where the months and labels are, so data
+    values and most title wording do not change it.
+    """
+    block, layout = [], []
+    for row in rows:
+        block.append(row)
+        kinds = [(c, kind) for c, kind in enumerate(map(_kind, row)) if kind]
+        layout.append(','.join(f"{c}{kind}" for c, kind in kinds))
+        if len(block) >= max_rows or len({kind for _, kind in kinds if kind[0] == 'm'}) == 12:
+            break
+    return block, hashlib.sha1('|'.join(layout).encode()).hexdigest()[:16]
+
+
+def detect_schema(rows):
+    """Schema from the first of rows that names all twelve months, else DEFAULT_SCHEMA"""
+    for r, row in enumerate(rows[:SCHEMA_SCAN_ROWS]):
+        months = {}
+        for c, value in enumerate(row):
+            month = _month(value)
+            if month is not None:
+                months.setdefault(month, c)
+        if len(months) < 12:
+            continue
+
+        month_cols = tuple(months[m] for m in range(1, 13))
+        labels = [(c, value.strip().lower()) for c, value in enumerate(row[:min(month_cols)])
+                  if isinstance(value, str) and value.strip()]
+        description = next((c for c, label in labels if any(key in label for key in DESCRIPTION_HEADERS)), None)
+        if description is None:
+            description = DEFAULT_SCHEMA.description_col if DEFAULT_SCHEMA.description_col < min(month_cols) else 0
+        unit = next((c for c, label in labels if any(key in label for key in UNIT_HEADERS)), None)
+        return TemplateSchema(r, description, unit, month_cols)
+    return DEFAULT_SCHEMA
+
+
+class SchemaCache:
+    """LRU of detected schemas keyed by header layout fingerprint; detection runs only on a miss"""
+
+    def __init__(self, max_entries=DEFAULT_SCHEMA_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def schema(self, rows):
+        rows, key = header_layout(rows)
+        with self._lock:
+            schema = self._entries.get(key)
+            if schema is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return schema
+            self.misses += 1
+        schema = detect_schema(rows)
+        with self._lock:
+            self._entries[key] = schema
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return schema
+
+    def __len__(self):
+        return len(self._entries)
+
+
+SCHEMAS = SchemaCache()
+
+
+def template_schema(rows):
+    """Schema of a sheet from its raw rows (tuples of cell values, header row included)"""
+    return SCHEMAS.schema(rows)
+
+
+def frame_schema(frame):
+    """Schema of a sheet already read into a DataFrame.
+
+    A frame from esg_extraction.read_main_sheet carries it in frame.attrs;
+    otherwise the column labels are taken as the sheet's first row, as
+    read_excel(header=0) leaves them ('Unnamed: n' labels standing for blanks).
+    """
+    schema = frame.attrs.get('schema')
+    if schema is not None:
+        return schema
+    labels = tuple(None if str(label).startswith('Unnamed:') else label for label in frame.columns)
+    head = frame.head(SCHEMA_SCAN_ROWS - 1).itertuples(index=False, name=None)
+    return template_schema([labels] + list(head))
+
+
+def schema_columns(schema):
+    """Sheet columns an extraction needs: description, unit (when known) and months"""
+    unit = () if schema.unit_col is None else (schema.unit_col,)
+    return sorted({schema.description_col, *unit, *schema.month_cols})
@@ -0,0 +1,192 @@
+"""
+ESG Site Master
+===============
+Registry of known sites (site_master.csv, or the file named by
+ESG_SITES_PATH): state, capacity, technology, O&M or construction category
+and commissioning date. Site names and aliases are indexed by their word
+tokens, so matching a file name costs the same for 20 sites or 2,000.
+Blank registry fields, and files matching no site, fall back to the file
+name heuristics. This module does not import Streamlit.
+"""
+
+import os
+import re
+
+import pandas as pd
+
+from esg_cache import content_hash
+
+DEFAULT_SITES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'site_master.csv')
+
+SITE_COLUMNS = ['site_name', 'aliases', 'state', 'capacity_mw', 'technology', 'category', 'commissioning_date']
+CATEGORIES = ('O&M', 'Construction')
+
+# Words and numbers are separate tokens: "Pailani1_20MW-Solar" -> pailani 1 20 mw solar
+TOKEN_RE = re.compile(r'[a-z]+|\d+')
+CAPACITY_RE = re.compile(r'(\d+)\s*mwp?')
+
+# Fallbacks for files that match no registry site
+STATE_KEYWORDS = {
+    'solapur': 'Maharashtra', 'augasi': 'Uttar Pradesh', 'panwari': 'Uttar Pradesh',
+    'pailani': 'Uttar Pradesh', 'gujarat': 'Gujarat', 'rajasthan': 'Rajasthan',
+    'karnataka': 'Karnataka', 'tamil nadu': 'Tamil Nadu', 'telangana': 'Telangana',
+    'madhya pradesh': 'Madhya Pradesh', 'haryana': 'Haryana', 'punjab': 'Punjab',
+    'odisha': 'Odisha', 'jharkhand': 'Jharkhand', 'chhattisgarh': 'Chhattisgarh'
+}
+DEFAULT_CAPACITY_MW = 100
+
+_loaded = {}
+
+
+def default_sites_path():
+    return os.environ.get('ESG_SITES_PATH') or DEFAULT_SITES_PATH
+
+
+def tokens(text):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+class PhraseIndex:
+    """Finds known phrases among the tokens of a text with one dict probe per token run.
+
+    The cost depends on the text length and the longest phrase, not on how
+    many phrases are indexed. The longest phrase found wins; ties go to the
+    earliest.
+    """
+
+    def __init__(self, phrases):
+        self.values = {}
+        for phrase, value in phrases:
+            key = tuple(tokens(phrase))
+            if key:
+                self.values.setdefault(key, value)
+        self.max_tokens = max(map(len, self.values), default=0)
+
+    def find(self, text, default=None):
+        words = tokens(text)
+        for n in range(min(self.max_tokens, len(words)), 0, -1):
+            for start in range(len(words) - n + 1):
+                value = self.values.get(tuple(words[start:start + n]))
+                if value is not None:
+                    return value
+        return default
+
+
+STATE_INDEX = PhraseIndex(STATE_KEYWORDS.items())
+
+
+def identify_state(filename):
+    """Guess the state from keywords in the file name.
+
+    Whole words are tried first; run-together names ('PailaniSolar',
+    'TamilNadu_20MW') fall back to a substring search, as the keywords
+    were originally matched.
+    """
+    state = STATE_INDEX.find(filename)
+    if state is not None:
+        return state
+    compact = re.sub(r'[^a-z0-9]', '', str(filename).lower())
+    for keyword, state in STATE_KEYWORDS.items():
+        if keyword.replace(' ', '') in compact:
+            return state
+    return 'Unknown'
+
+
+def guess_attributes(filename):
+    """(state, capacity_mw, technology) guessed from the file name alone"""
+    name = str(filename).lower()
+    tech = 'Solar' if 'solar' in name else ('Wind' if 'wind' in name else 'Hybrid')
+    cap_match = CAPACITY_RE.search(name)
+    capacity = int(cap_match.group(1)) if cap_match else DEFAULT_CAPACITY_MW
+    return identify_state(filename), capacity, tech
+
+
+class SiteRegistry:
+    def __init__(self, table, fingerprint):
+        self.table = table.reset_index(drop=True)
+        self.fingerprint = fingerprint
+        names = [(name, i) for i, name in enumerate(self.table['site_name'])]
+        aliases = [(alias, i) for i, row in enumerate(self.table['aliases'])
+                   for alias in row.split('|') if alias.strip()]
+        self.index = PhraseIndex(names + aliases)
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        table = pd.read_csv(path, dtype=str, keep_default_na=False)
+        missing = [column for column in SITE_COLUMNS if column not in table.columns]
+        if missing:
+            raise ValueError(f"{path}: missing column(s) {', '.join(missing)}")
+        table = table[SITE_COLUMNS].apply(lambda column: column.str.strip())
+
+        duplicates = table.loc[table['site_name'].duplicated(), 'site_name'].tolist()
+        if duplicates:
+            raise ValueError(f"{path}: duplicate site(s) {', '.join(duplicates)}")
+        unknown = sorted(set(table['category']) - set(CATEGORIES) - {''})
+        if unknown:
+            raise ValueError(f"{path}: unknown categories {', '.join(unknown)}")
+
+        table['capacity_mw'] = pd.to_numeric(table['capacity_mw'].replace('', None), errors='raise')
+        table['commissioning_date'] = pd.to_datetime(table['commissioning_date'].replace('', None), errors='raise')
+        return cls(table, content_hash(data)[:12])
+
+    def __len__(self):
+        return len(self.table)
+
+    def match(self, file_name):
+        """Registry row position of the site a file name refers to, or None"""
+        return self.index.find(file_name)
+
+    def site_name(self, file_name):
+        """Site master name of the site a file name refers to, or None"""
+        i = self.match(file_name)
+        return None if i is None else self.table.at[i, 'site_name']
+
+    def resolve(self, file_name):
+        """(state, capacity_mw, technology) for a file: registry values, else file name guesses"""
+        state, capacity, tech = guess_attributes(file_name)
+        i = self.match(file_name)
+        if i is None:
+            return state, capacity, tech
+        row = self.table.iloc[i]
+        return (row['state'] or state,
+                capacity if pd.isna(row['capacity_mw']) else row['capacity_mw'],
+                row['technology'] or tech)
+
+    def category_sites(self, category):
+        """Site names in one category, in registry order"""
+        return self.table.loc[self.table['category'] == category, 'site_name'].tolist()
+
+    def attributes(self, file_names):
+        """Registry attributes for many files at once, one row per file name.
+
+        Columns: Registry_Site (missing when unmatched), State, Capacity_MW,
+        Technology, Site_Category and Commissioning_Date. Blank state,
+        capacity and technology are filled from the file name; category and
+        date stay blank.
+        """
+        file_names = list(file_names)
+        positions = [self.match(name) for name in file_names]
+        matched = self.table.reindex([-1 if i is None else i for i in positions]).reset_index(drop=True)
+        guesses = pd.DataFrame([guess_attributes(name) for name in file_names],
+                               columns=['state', 'capacity_mw', 'technology'], index=matched.index)
+        return pd.DataFrame({
+            'Registry_Site': matched['site_name'],
+            'State': matched['state'].replace('', None).fillna(guesses['state']),
+            'Capacity_MW': matched['capacity_mw'].fillna(guesses['capacity_mw']),
+            'Technology': matched['technology'].replace('', None).fillna(guesses['technology']),
+            'Site_Category': matched['category'].fillna(''),
+            'Commissioning_Date': matched['commissioning_date'],
+        })
+
+
+def load_sites(path=None):
+    """Registry for a site master file, reloaded only when the file changes"""
+    path = path or default_sites_path()
+    mtime = os.path.getmtime(path)
+    cached = _loaded.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, SiteRegistry.from_csv(path))
+        _loaded[path] = cached
+    return cached[1]
@@ -0,0 +1,351 @@
+"""
+ESG Fact Store
+==============
+Persistent SQLite store of extracted site activity data: one row per
+(site, period, resource, month) with the activity value and its emissions.
+The period is the reporting year of the workbook ('2025', or '' when
+unknown), so uploads of different years build up a history. The portfolio
+views are read back with indexed queries instead of re-parsing Excel, and
+emissions are recomputed in place when the emission factors change.
+Month, financial-quarter and financial-year totals per site and per state
+are kept in a rollups table, updated whenever the facts of a site change.
+This module does not import Streamlit.
+"""
+
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from esg_extraction import MONTHS, RESOURCE_UNITS
+from esg_factors import load_factors
+from esg_portfolio import RESOURCE_FIELDS, PortfolioTensor
+from esg_records import sunsure_arrays
+from esg_sites import load_sites
+from esg_periods import period_buckets
+
+DEFAULT_STORE_PATH = 'sunsure_esg_store.db'
+
+ROLLUP_COLUMNS = ['level', 'key', 'state', 'grain', 'bucket', 'resource', 'activity', 'emissions_tco2e']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sites (
+    site_name TEXT PRIMARY KEY,
+    state TEXT,
+    technology TEXT,
+    capacity_mw REAL,
+    ingested_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sites_state ON sites(state);
+CREATE TABLE IF NOT EXISTS facts (
+    site_name TEXT NOT NULL,
+    period TEXT NOT NULL DEFAULT '',
+    resource TEXT NOT NULL,
+    month INTEGER NOT NULL,
+    activity REAL NOT NULL,
+    scope INTEGER,
+    emissions_tco2e REAL NOT NULL,
+    PRIMARY KEY (site_name, period, resource, month)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_facts_period_resource ON facts(period, resource);
+CREATE TABLE IF NOT EXISTS file_manifest (
+    file_name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    site_name TEXT NOT NULL,
+    parse_seconds REAL NOT NULL,
+    ingested_at TEXT
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    level TEXT NOT NULL,
+    key TEXT NOT NULL,
+    state TEXT,
+    grain TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    resource TEXT NOT NULL,
+    activity REAL NOT NULL,
+    emissions_tco2e REAL NOT NULL,
+    PRIMARY KEY (level, grain, key, bucket, resource)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rollups_state ON rollups(level, state);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def default_store_path():
+    return os.environ.get('ESG_STORE_PATH') or DEFAULT_STORE_PATH
+
+
+def records_to_facts(records, period='', factors=None):
+    """Flatten SunsureKPIRecords into site-month activity rows with their scope and emissions.
+
+    Each record's own period is used when it has one, else period.
+    """
+    sites = np.repeat([record.site_name for record in records], len(MONTHS))
+    states = np.repeat([record.state for record in records], len(MONTHS))
+    periods = np.repeat([record.period or period for record in records], len(MONTHS))
+    months = np.tile(np.arange(1, len(MONTHS) + 1), len(records))
+    activity, _ = sunsure_arrays(records)
+    blocks = [
+        pd.DataFrame({
+            'site_name': sites, 'state': states, 'resource': resource, 'month': months,
+            'activity': activity[:, r].reshape(-1),
+        })
+        for r, resource in enumerate(RESOURCE_FIELDS)
+    ]
+    facts = pd.concat(blocks, ignore_index=True).assign(period=np.tile(periods, len(RESOURCE_FIELDS)))
+    facts['unit'] = facts['resource'].map(RESOURCE_UNITS)
+    return (factors or load_factors()).apply(facts)
+
+
+def rollup_facts(facts):
+    """Site-level rollup rows (ROLLUP_COLUMNS) of dated facts with site_name, state, period, month and resource"""
+    facts = facts.merge(period_buckets(facts['period']), on=['period', 'month'])
+    keys, values = ['site_name', 'state', 'resource'], ['activity', 'emissions_tco2e']
+    # Months roll up into financial quarters, and quarters into financial years
+    months = facts.groupby(keys + ['month_bucket', 'quarter', 'fy'], as_index=False)[values].sum()
+    quarters = months.groupby(keys + ['quarter', 'fy'], as_index=False)[values].sum()
+    years = quarters.groupby(keys + ['fy'], as_index=False)[values].sum()
+    return pd.concat([
+        totals.rename(columns={bucket: 'bucket', 'site_name': 'key'}).assign(level='site', grain=grain)
+        for grain, bucket, totals in (('month', 'month_bucket', months), ('quarter', 'quarter', quarters),
+                                      ('fy', 'fy', years))
+    ], ignore_index=True)[ROLLUP_COLUMNS]
+
+
+def _scopes(facts):
+    # SQLite wants None, not NaN, for resources without a factor (e.g. water)
+    return [None if np.isnan(scope) else int(scope) for scope in facts['scope'].to_numpy(dtype=float)]
+
+
+class FactStore:
+    def __init__(self, path=None):
+        self.path = path or default_store_path()
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # Short-lived connections: Streamlit runs each session on its own thread
+        return sqlite3.connect(self.path, timeout=30)
+
+    def write_records(self, records, period='', factors=None):
+        """Insert or replace the facts of each record (one site and period per record).
+
+        Of several records for the same site and period, the last one is
+        written, as if each had been written in turn.
+        """
+        records = list({(record.site_name, record.period or period): record for record in records}.values())
+        if not records:
+            return
+        factors = factors or load_factors()
+        # Stored rows must use the same factors as the ones being written
+        self.sync_factors(factors)
+        facts = records_to_facts(records, period, factors)
+        now = datetime.now().isoformat(timespec='seconds')
+        with closing(self._connect()) as conn, conn:
+            for record in records:
+                site = record.site_name
+                conn.execute(
+                    'INSERT OR REPLACE INTO sites VALUES (?, ?, ?, ?, ?)',
+                    (site, record.state, record.technology, record.capacity, now)
+                )
+                # A newer snapshot of the same site and year replaces the older one; other years are kept
+                conn.execute('DELETE FROM facts WHERE site_name = ? AND period = ?', (site, record.period or period))
+            conn.executemany('INSERT INTO facts VALUES (?, ?, ?, ?, ?, ?, ?)', zip(
+                facts['site_name'], facts['period'], facts['resource'], facts['month'].tolist(),
+                facts['activity'].tolist(), _scopes(facts), facts['emissions_tco2e'].tolist()
+            ))
+            self._refresh_rollups(conn, [record.site_name for record in records])
+
+    def factors_fingerprint(self):
+        """Fingerprint of the emission factors the stored emissions were computed with"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'factors'").fetchone()
+            return row[0] if row else None
+
+    def recompute_emissions(self, factors=None):
+        """Recompute scope and emissions of every stored fact from the activity data; returns the rows changed"""
+        factors = factors or load_factors()
+        with closing(self._connect()) as conn, conn:
+            facts = pd.read_sql_query(
+                'SELECT f.site_name, f.period, f.resource, f.month, f.activity, s.state, '
+                'f.scope AS stored_scope, f.emissions_tco2e AS stored_emissions '
+                'FROM facts f LEFT JOIN sites s ON s.site_name = f.site_name', conn
+            )
+            facts['unit'] = facts['resource'].map(RESOURCE_UNITS)
+            facts = factors.apply(facts)
+            # Only rows whose factor actually changed are written back
+            same_scope = (facts['scope'] == facts['stored_scope']) | (facts['scope'].isna() & facts['stored_scope'].isna())
+            facts = facts[~(same_scope & (facts['emissions_tco2e'] == facts['stored_emissions']))]
+            conn.executemany(
+                'UPDATE facts SET scope = ?, emissions_tco2e = ? '
+                'WHERE site_name = ? AND period = ? AND resource = ? AND month = ?',
+                zip(_scopes(facts), facts['emissions_tco2e'].tolist(), facts['site_name'],
+                    facts['period'], facts['resource'], facts['month'].tolist())
+            )
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('factors', ?)", (factors.fingerprint,))
+            if len(facts):
+                self._refresh_rollups(conn, facts['site_name'].unique().tolist())
+        return len(facts)
+
+    def sync_factors(self, factors=None):
+        """Recompute stored emissions if the factors changed since they were computed; True if they did"""
+        factors = factors or load_factors()
+        if self.factors_fingerprint() == factors.fingerprint:
+            return False
+        self.recompute_emissions(factors)
+        return True
+
+    def sync_sites(self, sites=None):
+        """Forget the file manifest if the site master changed since it was written; True if it did.
+
+        Site attributes are resolved while parsing, so files must be parsed
+        again rather than skipped as unchanged.
+        """
+        sites = sites or load_sites()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'sites'").fetchone()
+            if row and row[0] == sites.fingerprint:
+                return False
+            conn.execute('DELETE FROM file_manifest')
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('sites', ?)", (sites.fingerprint,))
+        return True
+
+    def file_manifest(self):
+        """Fingerprints of previously ingested files, keyed by file name"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute('SELECT file_name, size, content_hash, site_name, parse_seconds FROM file_manifest')
+            return {
+                row[0]: {'size': row[1], 'content_hash': row[2], 'site_name': row[3], 'parse_seconds': row[4]}
+                for row in rows
+            }
+
+    def record_files(self, entries):
+        """Remember (file_name, size, content_hash, site_name, parse_seconds) for ingested files"""
+        now = datetime.now().isoformat(timespec='seconds')
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO file_manifest VALUES (?, ?, ?, ?, ?, ?)',
+                [tuple(entry) + (now,) for entry in entries]
+            )
+
+    def _refresh_rollups(self, conn, site_names):
+        """Rebuild the rollups of the given sites, then of every state they are or were in"""
+        site_names = list(dict.fromkeys(site_names))
+        if not site_names:
+            return
+        marks = ','.join('?' * len(site_names))
+        states = {row[0] for row in conn.execute(
+            f"SELECT DISTINCT state FROM rollups WHERE level = 'site' AND key IN ({marks})", site_names)}
+        facts = pd.read_sql_query(
+            'SELECT f.site_name, s.state, f.period, f.month, f.resource, f.activity, f.emissions_tco2e '
+            'FROM facts f JOIN sites s ON s.site_name = f.site_name '
+            f"WHERE f.period != '' AND f.site_name IN ({marks})", conn, params=site_names
+        )
+        conn.execute(f"DELETE FROM rollups WHERE level = 'site' AND key IN ({marks})", site_names)
+        if len(facts):
+            rollups = rollup_facts(facts)
+            conn.executemany(f"INSERT INTO rollups VALUES ({','.join('?' * len(ROLLUP_COLUMNS))})",
+                             rollups.astype(object).itertuples(index=False, name=None))
+            states |= set(rollups['state'])
+
+        # State totals are sums of the (few) site rollup rows, not of the facts
+        states = sorted(state for state in states if state is not None)
+        if states:
+            marks = ','.join('?' * len(states))
+            conn.execute(f"DELETE FROM rollups WHERE level = 'state' AND key IN ({marks})", states)
+            conn.execute(
+                "INSERT INTO rollups SELECT 'state', state, state, grain, bucket, resource, "
+                'SUM(activity), SUM(emissions_tco2e) FROM rollups '
+                f"WHERE level = 'site' AND state IN ({marks}) GROUP BY state, grain, bucket, resource", states
+            )
+
+    def rollups(self, grain='fy', level='state', keys=None):
+        """Precomputed totals (key, bucket, resource, activity, emissions_tco2e) at a grain.
+
+        grain is 'month', 'quarter' or 'fy' (Indian financial year) and level
+        'site' or 'state'; keys limits the sites or states returned.
+        """
+        key_filter = f" AND key IN ({','.join('?' * len(keys))})" if keys is not None else ''
+        return self._query(
+            'SELECT key, bucket, resource, activity, emissions_tco2e FROM rollups '
+            f'WHERE level = ? AND grain = ?{key_filter} ORDER BY key, bucket, resource',
+            [level, grain] + (list(keys) if keys is not None else [])
+        )
+
+    def periods(self):
+        """Reporting periods held in the store, oldest first ('' for undated data)"""
+        with closing(self._connect()) as conn:
+            return [row[0] for row in conn.execute('SELECT DISTINCT period FROM facts ORDER BY period')]
+
+    def site_names(self, period=None):
+        """Sites with facts in a period, or in any period when period is None"""
+        with closing(self._connect()) as conn:
+            if period is None:
+                rows = conn.execute('SELECT DISTINCT site_name FROM facts ORDER BY site_name')
+            else:
+                rows = conn.execute('SELECT DISTINCT site_name FROM facts WHERE period = ? ORDER BY site_name', (period,))
+            return [row[0] for row in rows]
+
+    def _query(self, sql, params):
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    @staticmethod
+    def _period_filter(period):
+        # None selects each site's latest stored period
+        if period is None:
+            return 'f.period = (SELECT MAX(p.period) FROM facts p WHERE p.site_name = f.site_name)', []
+        return 'f.period = ?', [period]
+
+    @staticmethod
+    def _site_filter(site_names):
+        if site_names is None:
+            return '', []
+        return f" AND f.site_name IN ({','.join('?' * len(site_names))})", list(site_names)
+
+    def portfolio_tensor(self, site_names=None, period=None):
+        """Load stored facts as a PortfolioTensor, in site_names order when given.
+
+        period=None loads each site's latest reporting period.
+        """
+        period_filter, period_params = self._period_filter(period)
+        site_filter, params = self._site_filter(site_names)
+        facts = self._query(
+            'SELECT f.site_name, s.state, s.capacity_mw, s.technology, f.resource, f.month, '
+            'f.activity, f.scope, f.emissions_tco2e '
+            'FROM facts f JOIN sites s ON s.site_name = f.site_name '
+            f'WHERE {period_filter}{site_filter}',
+            period_params + params
+        )
+        return PortfolioTensor.from_facts(facts, site_names)
+
+    def portfolio_frame(self, site_names=None, period=None):
+        """Rebuild the portfolio DataFrame (same columns as the KPI records) from stored facts"""
+        return self.portfolio_tensor(site_names, period).to_frame()
+
+    def refresh_portfolio(self, previous, site_names, changed_sites, period=None):
+        """Update a previously loaded PortfolioTensor in place of a full reload.
+
+        Sites that are unchanged are kept, sites no longer uploaded are
+        dropped, and only changed or missing sites are read from the store.
+        previous must have been read from this store after the last write of
+        its unchanged sites (for example at the start of the same ingest);
+        rows kept from an older tensor would miss other sessions' writes.
+        """
+        if previous is None or not len(previous):
+            return self.portfolio_tensor(site_names, period)
+
+        changed = set(changed_sites)
+        kept = previous.take([name for name in site_names if name not in changed])
+        missing = [name for name in site_names if name not in kept.site_index]
+        if missing:
+            kept = PortfolioTensor.concat([kept, self.portfolio_tensor(missing, period)])
+        return kept.take(site_names)
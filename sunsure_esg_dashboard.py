@@ -1,36 +1,50 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-from PIL import Image
-import base64
+import plotly.graph_objects as go
 import os
-import re
-import io
+import time
 from datetime import datetime
+from esg_extraction import MONTHS
+from esg_periods import detect_period
+from esg_cache import ParseCache, DEFAULT_MAX_ENTRIES
+from esg_ingest import IngestJob, create_pool, default_workers, file_fingerprint
+from esg_store import FactStore
+from esg_factors import load_factors
+from esg_sites import load_sites
+from esg_aggregates import RunningAggregates
+from esg_profiling import StageProfile, activated, stage
+from esg_debug import debug_panel, show_profile
+from esg_assets import prepare_assets, asset_url
+from esg_reports import (EXPORT_BUILDERS, ExportCache, PORTFOLIO_REPORT_NAME,
+                         STATE_ANALYSIS_NAME, EXECUTIVE_SUMMARY_NAME)
 
 SUNSURE_GREEN = "#0a4635"
 SUNSURE_RED = "#fd3a20"
 SUNSURE_BLACK = "#111111"
 
+# Images are resized and recompressed once per process, not on every rerun
+@st.cache_resource(show_spinner=False)
+def get_assets():
+    return prepare_assets()
+
+ASSETS = get_assets()
+STATIC_SERVING = bool(st.get_option("server.enableStaticServing"))
+
 st.set_page_config(
     page_title="Sunsure Energy | ESG Performance Dashboard",
-    page_icon="sunsure_icon.png",
+    page_icon=ASSETS['icon'].path if 'icon' in ASSETS else "🌱",
     layout="wide",
     initial_sidebar_state="expanded"
 )
 
-def get_base64_of_bin_file(bin_file):
-    with open(bin_file, 'rb') as f:
-        data = f.read()
-    return base64.b64encode(data).decode()
-
-img_path = "homepage-flyer1.jpg"
-if os.path.exists(img_path):
-    img_base64 = get_base64_of_bin_file(img_path)
-    page_bg_css = f"""
+@st.cache_resource(show_spinner=False)
+def get_page_css(static_serving):
+    background = ASSETS.get('background')
+    page_background = f', url("{asset_url(background, static_serving)}")' if background else ''
+    return f"""
     <style>
     [data-testid="stAppViewContainer"] {{
-        background: linear-gradient(rgba(255,255,255,0.88), rgba(255,255,255,0.88)), url("data:image/jpg;base64,{img_base64}");
+        background: linear-gradient(rgba(255,255,255,0.88), rgba(255,255,255,0.88)){page_background};
         background-size: cover; background-repeat:no-repeat; background-position:center;
     }}
     .feature-card {{
@@ -205,11 +219,12 @@ if os.path.exists(img_path):
     }}
     </style>
     """
-    st.markdown(page_bg_css, unsafe_allow_html=True)
 
-# Site data structure
-OM_SITES = ["Pailani 1", "Pailani 2", "Pinahat", "Gursarai", "Panwari", "Augasi", "Solapur", "Erandol"]
-CONSTRUCTION_SITES = ["Niwali", "Dhule", "Mau", "Erach", "Illayangudi", "Bikaner IV", "Bikaner III", "Kabrai", "Charkhari", "Jath", "Bijapur", "Mundsar"]
+st.markdown(get_page_css(STATIC_SERVING), unsafe_allow_html=True)
+
+# Site data structure, from the site master registry (site_master.csv)
+OM_SITES = load_sites().category_sites('O&M')
+CONSTRUCTION_SITES = load_sites().category_sites('Construction')
 
 # Session state management
 if 'page' not in st.session_state:
@@ -219,12 +234,19 @@ if 'site_category' not in st.session_state:
 if 'selected_site' not in st.session_state:
     st.session_state.selected_site = None
 
+def go_to(page, site_category=None, selected_site=None):
+    # Used as an on_click callback: the state changes before the rerun the click triggers,
+    # so navigating costs one script run instead of two
+    st.session_state.page = page
+    st.session_state.site_category = site_category
+    st.session_state.selected_site = selected_site
+
 with st.sidebar:
     st.markdown(f"""
         <div style="background: linear-gradient(135deg, {SUNSURE_RED} 0%, #ff6b54 100%);
                     color: white; padding: 1.5rem; border-radius: 12px; margin-bottom: 2rem; text-align: center;">
             <h2 style="margin: 0; font-family: 'Inter', sans-serif;">
-                <img src="sunsure_sidebar_icon.png" style="height:32px;vertical-align:middle;margin-bottom:6px;margin-right:7px;">
+                <img src="{asset_url(ASSETS['icon_white'], STATIC_SERVING) if 'icon_white' in ASSETS else ''}" style="height:32px;vertical-align:middle;margin-bottom:6px;margin-right:7px;">
                 SUNSURE ENERGY
             </h2>
             <p style="margin: 0.5rem 0 0 0; opacity: 0.9;">ESG Data Upload Portal</p>
@@ -232,11 +254,7 @@ with st.sidebar:
     """, unsafe_allow_html=True)
     
     if st.session_state.page != 'main':
-        if st.button("🏠 Back to Main", key="sidebar_home"):
-            st.session_state.page = 'main'
-            st.session_state.site_category = None
-            st.session_state.selected_site = None
-            st.rerun()
+        st.button("🏠 Back to Main", key="sidebar_home", on_click=go_to, args=('main',))
     
     uploaded_files = st.file_uploader(
         "Upload Site Excel Files",
@@ -245,110 +263,267 @@ with st.sidebar:
         help="Upload Excel files from Sunsure Energy sites"
     )
     
+    ingest_workers = st.number_input(
+        "Parallel workers", min_value=1, max_value=max(os.cpu_count() or 1, default_workers()),
+        value=default_workers(), help="Number of processes used to parse uploaded files"
+    )
+    incremental_ingest = st.checkbox(
+        "Skip unchanged files", value=True,
+        help="Reuse stored results for files whose name, size and content are unchanged"
+    )
+    
+    profile_enabled, profile_memory, profile_output = debug_panel('sunsure_debug')
+    
     with st.expander("ℹ️ About Sunsure Energy"):
         st.markdown(
             '<a href="https://sunsure-energy.com/" target="_blank" style="color:#fd3a20;font-weight:600;text-decoration:underline;">Visit the official Sunsure Energy website</a>',
             unsafe_allow_html=True
         )
 
-def identify_state(filename):
-    mapping = {
-        'solapur': 'Maharashtra', 'augasi': 'Uttar Pradesh', 'panwari': 'Uttar Pradesh',
-        'pailani': 'Uttar Pradesh', 'gujarat': 'Gujarat', 'rajasthan': 'Rajasthan',
-        'karnataka': 'Karnataka', 'tamil nadu': 'Tamil Nadu', 'telangana': 'Telangana',
-        'madhya pradesh': 'Madhya Pradesh', 'haryana': 'Haryana', 'punjab': 'Punjab',
-        'odisha': 'Odisha', 'jharkhand': 'Jharkhand', 'chhattisgarh': 'Chhattisgarh'
+# Parsed KPI records shared across reruns and sessions, keyed by file content
+@st.cache_resource
+def get_parse_cache():
+    return ParseCache(
+        max_entries=int(os.environ.get('ESG_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+        cache_dir=os.environ.get('ESG_CACHE_DIR') or None
+    )
+
+# Download payloads shared across reruns and sessions, keyed by a hash of the portfolio
+@st.cache_resource
+def get_export_cache():
+    return ExportCache()
+
+# Persistent site-month fact store (location from ESG_STORE_PATH)
+@st.cache_resource
+def get_fact_store():
+    return FactStore()
+
+@st.cache_resource
+def get_ingest_pool(max_workers):
+    return create_pool(max_workers)
+
+def upload_key(files):
+    # Identifies one set of uploads; a re-upload gets a new file_id even under the same name
+    return tuple((file.file_id, file.name, file.size) for file in files)
+
+def site_categories(site_names):
+    # O&M / Construction category of each site from the site master ('' when unlisted)
+    site_names = list(site_names)
+    return dict(zip(site_names, load_sites().attributes(site_names)['Site_Category']))
+
+def set_portfolio(tensor, files_key=None, messages=(), aggregates=None):
+    # Aggregate and build the figures once; later reruns only render them.
+    # Export payloads are built on the first download request (see download_buttons).
+    # An ingest passes its running aggregates, already updated for the changed sites only
+    with stage('aggregate'):
+        if aggregates is None:
+            aggregates = RunningAggregates.from_tensor(tensor, site_categories(tensor.site_names))
+        state_summary = aggregates.state_summary()
+        export_key = tensor.fingerprint()
+    with stage('site_views'):
+        # Site pages read these by site master name (or file name when unmatched)
+        sites = load_sites()
+        site_views = tensor.site_views([sites.site_name(name) or name for name in tensor.site_names])
+    with stage('figures'):
+        trend_fig = px.line(x=MONTHS, y=tensor.monthly_emissions(),
+                            labels={'x': 'Month', 'y': 'GHG Emissions (tCO₂e)'},
+                            color_discrete_sequence=[SUNSURE_GREEN])
+    st.session_state.portfolio = {
+        'files': files_key,
+        'sites': list(tensor.site_names),
+        'tensor': tensor,
+        'aggregates': aggregates,
+        'state_summary': state_summary,
+        'figures': {'monthly_ghg': trend_fig},
+        'export_key': export_key,
+        'site_views': site_views,
+        'messages': list(messages),
+        'factors': load_factors().fingerprint,
     }
-    filename_lower = filename.lower()
-    for key, state in mapping.items():
-        if key in filename_lower:
-            return state
-    return 'Unknown'
-
-def extract_monthly_values(row, resource_keys):
-    months = ['January','February','March','April','May','June','July',
-              'August','September','October','November','December']
-    values = []
-    for i, month in enumerate(months, 5):
-        try:
-            val = row.iloc[i] if i < len(row) else 0
-            if pd.isna(val):
-                values.append(0)
-            elif isinstance(val, (float, int)):
-                values.append(val)
-            elif isinstance(val, str):
-                numbers = re.findall(r'\d+\.?\d*', val)
-                values.append(float(numbers[0]) if numbers else 0)
+
+def current_portfolio():
+    # Emission factors edited since the portfolio was built: recompute the stored
+    # emissions from the activity data and rebuild, without re-reading any Excel
+    portfolio = st.session_state.get('portfolio')
+    if portfolio and portfolio['factors'] != load_factors().fingerprint:
+        store = get_fact_store()
+        store.sync_factors()
+        set_portfolio(store.portfolio_tensor(portfolio['sites']), portfolio['files'], portfolio['messages'])
+        portfolio = st.session_state.portfolio
+    return portfolio
+
+def open_stored_portfolio():
+    store = get_fact_store()
+    store.sync_factors()
+    set_portfolio(store.portfolio_tensor())
+
+def start_portfolio_ingest(files, workers, incremental=True, profiled=False, trace_memory=False):
+    store = get_fact_store()
+    # Stages are only recorded when the debug panel turns profiling on
+    profile = StageProfile(trace_memory=trace_memory) if profiled else None
+    
+    # Files whose name, size and content hash match the last ingest reuse their stored facts
+    with activated(profile), stage('plan'):
+        sites = load_sites()
+        store.sync_sites(sites)
+        manifest = store.file_manifest() if incremental else {}
+        stored_sites = set(store.site_names()) if incremental else set()
+        site_order, jobs, fingerprints = [], [], []
+        skipped_sites, saved_seconds = [], 0.0
+        for file in files:
+            data = file.getvalue()
+            # Files of a known site share its site master name, so each reporting period adds to its history
+            site_name = sites.site_name(file.name) or file.name.replace('.xlsx','').replace('.xls','')
+            name, size, digest = file_fingerprint(file.name, data)
+            previous = manifest.get(name)
+            if (previous and previous['size'] == size and previous['content_hash'] == digest
+                    and previous['site_name'] == site_name and site_name in stored_sites):
+                site_order.append((site_name, None))
+                skipped_sites.append(site_name)
+                saved_seconds += previous['parse_seconds']
             else:
-                values.append(0)
-        except Exception:
-            values.append(0)
-    return months, values
-
-def process_excel_file(uploaded_file, site_name):
-    try:
-        excel_data = pd.read_excel(uploaded_file, sheet_name=None)
-        main_sheet_names = ['Project 1', 'Site_Template', 'Consolidated_Data', 'Data']
-        main_sheet = None
-        for sheet_name in main_sheet_names:
-            if sheet_name in excel_data:
-                main_sheet = excel_data[sheet_name]
-                break
-        if main_sheet is None:
-            main_sheet = list(excel_data.values())[0]
+                site_order.append((None, len(jobs)))
+                jobs.append((data, file.name, site_name))
+                fingerprints.append((name, size, digest))
         
-        state = identify_state(uploaded_file.name)
-        capacity = 100
-        tech = 'Solar' if 'solar' in uploaded_file.name.lower() else (
-            'Wind' if 'wind' in uploaded_file.name.lower() else 'Hybrid')
-        cap_match = re.search(r'(\d+)\s*mwp?', uploaded_file.name.lower())
-        if cap_match:
-            capacity = int(cap_match.group(1))
-        
-        water_total, diesel_total, elec_total, cement_total, ghg_total_s1, ghg_total_s2, ghg_total_s3 = 0,0,0,0,0,0,0
-        water_monthly = [0]*12
-        diesel_monthly = [0]*12
-        elec_monthly = [0]*12
-        cement_monthly = [0]*12
-        
-        for idx, row in main_sheet.iterrows():
-            if len(row) < 4:
-                continue
-            desc_str = str(row.iloc[2]).lower()
-            if "water" in desc_str:
-                m,v = extract_monthly_values(row, 'water')
-                water_monthly = [w+val for w,val in zip(water_monthly, v)]
-                water_total += sum(v)
-            elif "diesel" in desc_str or "fuel" in desc_str:
-                m,v = extract_monthly_values(row,"diesel")
-                diesel_monthly = [d+val for d, val in zip(diesel_monthly, v)]
-                diesel_total += sum(v)
-                ghg_total_s1 += sum(v)*0.00268
-            elif "electricity" in desc_str:
-                m,v = extract_monthly_values(row,"electricity")
-                elec_monthly = [e+val for e,val in zip(elec_monthly, v)]
-                elec_total += sum(v)
-                ghg_total_s2 += sum(v)*0.82/1000
-            elif "cement" in desc_str:
-                m,v = extract_monthly_values(row,"cement")
-                cement_monthly = [c+val for c,val in zip(cement_monthly, v)]
-                cement_total += sum(v)
-                ghg_total_s3 += sum(v)*0.52/1000
-        
-        ghg_total = ghg_total_s1 + ghg_total_s2 + ghg_total_s3
-        
-        return {
-            'Site_Name': site_name, 'State': state, 'Capacity_MW': capacity, 'Technology': tech,
-            'Water_Total': water_total, 'Diesel_Total': diesel_total,
-            'Electricity_Total': elec_total, 'Cement_Total': cement_total,
-            'Water_Monthly': water_monthly, 'Diesel_Monthly': diesel_monthly,
-            'Elec_Monthly': elec_monthly, 'Cement_Monthly': cement_monthly,
-            'GHG_Total_Scope1': ghg_total_s1, 'GHG_Total_Scope2': ghg_total_s2,
-            'GHG_Total_Scope3': ghg_total_s3, 'GHG_Total': ghg_total
-        }
-    except Exception as e:
-        st.warning(f"Error processing {site_name}: {e}")
-        return None
+        # Unchanged files are read back from the store, not from this session's portfolio:
+        # another session may have ingested a newer version of them since it was built
+        store.sync_factors()
+        stored = store.portfolio_tensor(skipped_sites)
+        # Headline totals while parsing: the unchanged sites, plus each file as it finishes
+        running = RunningAggregates.from_tensor(stored, site_categories(stored.site_names))
+    
+    # Parse the rest on a background thread; the page polls it and renders partial results
+    executor = get_ingest_pool(workers) if workers > 1 else None
+    job = IngestJob(jobs, 'sunsure', executor=executor, cache=get_parse_cache(),
+                    profile=profiled, trace_memory=trace_memory)
+    st.session_state.ingest = {
+        'files': upload_key(files),
+        'job': job.start(),
+        'profile': profile,
+        'workers': workers,
+        'site_order': site_order,
+        'fingerprints': fingerprints,
+        'file_count': len(files),
+        'skipped': len(skipped_sites),
+        'saved_seconds': saved_seconds,
+        'stored': stored,
+        'aggregates': running,
+        'aggregated': set(),
+    }
+
+def finish_portfolio_ingest(ingest):
+    job = ingest['job']
+    store = get_fact_store()
+    profile = ingest['profile']
+    messages = []
+    
+    parsed = []
+    for (_, file_name, site_name), fingerprint, result in zip(job.jobs, ingest['fingerprints'], job.results):
+        if result is None:
+            continue
+        site_dict, error, seconds, stages = result
+        if profile is not None:
+            profile.add(stages)
+        if error:
+            messages.append(('warning', f"Error processing {site_name}: {error}"))
+        elif site_dict:
+            parsed.append((file_name, site_dict, fingerprint + (site_name, seconds)))
+    parsed = latest_snapshots(parsed, messages)
+    changed_records = [record for _, record, _ in parsed]
+    manifest_entries = [entry for _, _, entry in parsed]
+    # Elapsed time of the whole (possibly parallel) parse; per-file stages add up to more
+    if profile is not None:
+        profile.add([{'stage': 'ingest', 'file': None, 'wall_s': job.finished_at - job.started_at,
+                      'cpu_s': None, 'peak_mb': None}])
+    
+    with activated(profile):
+        with stage('store_write'):
+            store.write_records(changed_records)
+            store.record_files(manifest_entries)
+        tensor, site_names = finish_portfolio_tensor(ingest, store, changed_records)
+        report_ingest(ingest, site_names, messages)
+        # Re-read the changed sites from the stored facts; unchanged sites keep their running totals
+        with stage('aggregate'):
+            changed_sites = [record.site_name for record in changed_records]
+            aggregates = ingest['aggregates']
+            aggregates.sync(tensor, changed_sites, site_categories(changed_sites))
+        set_portfolio(tensor, ingest['files'], messages, aggregates)
+    
+    if profile is not None:
+        log_path = profile.write_jsonl(app='sunsure', files=ingest['file_count'], workers=ingest['workers'])
+        st.session_state.last_profile = (profile, log_path)
+
+def latest_snapshots(parsed, messages):
+    # Several files of one site and year (e.g. the July and August snapshots) would
+    # replace each other in the store: keep the one whose file name has the latest
+    # month (upload order breaks ties) and say which files were left out
+    latest = {}
+    for item in parsed:
+        file_name, record, _ = item
+        key = (record.site_name, record.period)
+        if key not in latest or (detect_period(file_name) or (0, 0)) >= (detect_period(latest[key][0]) or (0, 0)):
+            latest[key] = item
+    kept = []
+    for item in parsed:
+        file_name, record, _ = item
+        newest = latest[(record.site_name, record.period)]
+        if item is newest:
+            kept.append(item)
+        else:
+            messages.append(('info', f"⏭️ {file_name} left out: {newest[0]} is a later snapshot of "
+                                     f"{record.site_name} {record.period or '(undated)'}"))
+    return kept
+
+def finish_portfolio_tensor(ingest, store, changed_records):
+    job = ingest['job']
+    
+    # Keep upload order, leaving out files that failed to parse or were cancelled
+    parsed_names = [result[0].site_name if result and result[0] else None for result in job.results]
+    site_names = [name if job_idx is None else parsed_names[job_idx] for name, job_idx in ingest['site_order']]
+    site_names = list(dict.fromkeys(name for name in site_names if name is not None))
+    
+    changed_sites = [record.site_name for record in changed_records]
+    with stage('load_portfolio'):
+        tensor = store.refresh_portfolio(ingest['stored'], site_names, changed_sites)
+    return tensor, site_names
+
+def report_ingest(ingest, site_names, messages):
+    job = ingest['job']
+    if job.error:
+        messages.append(('warning', f"Ingestion stopped: {job.error}"))
+    if job.cancelled:
+        messages.append(('info', f"⏹️ Cancelled: {len(site_names)} of {ingest['file_count']} file(s) included"))
+    if ingest['skipped']:
+        messages.append(('info', f"⏭️ {ingest['skipped']} unchanged file(s) skipped, saving about {ingest['saved_seconds']:.1f}s of parsing"))
+
+@st.fragment(run_every=1.0)
+def render_ingest_progress():
+    ingest = st.session_state.get('ingest')
+    if ingest is None:
+        return
+    job = ingest['job']
+    
+    if job.finished:
+        finish_portfolio_ingest(ingest)
+        del st.session_state.ingest
+        st.rerun()
+    
+    elapsed = time.perf_counter() - job.started_at
+    st.progress(job.done / max(job.total, 1), text=f"Processing {job.done} of {job.total} changed file(s) · {elapsed:.0f}s")
+    if not job.cancelled and st.button("⏹️ Cancel Processing", key="cancel_ingest"):
+        job.cancel()
+    
+    # Partial portfolio: unchanged sites plus every file finished so far, each added once
+    aggregates, aggregated = ingest['aggregates'], ingest['aggregated']
+    finished = [(i, result[0]) for i, result in job.completed() if i not in aggregated]
+    categories = site_categories(record.site_name for _, record in finished if record)
+    for i, record in finished:
+        aggregated.add(i)
+        if record:
+            aggregates.set_record(record, categories[record.site_name])
+    if len(aggregates):
+        render_portfolio_summary(aggregates)
 
 def kpi_card_white(title, value, unit):
     return f"""
@@ -358,40 +533,118 @@ def kpi_card_white(title, value, unit):
         <div class="kpi-unit-gray">{unit}</div>
     </div>"""
 
-def download_buttons(df, state_summary):
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, sheet_name='Portfolio_KPIs', index=False)
-        state_summary.to_excel(writer, sheet_name='State_Summary', index=False)
-    
+def export_payload(cache, portfolio, file_name):
+    # Called on the download's own thread; the same portfolio is built only once
+    tensor, state_summary = portfolio['tensor'], portfolio['state_summary']
+    return cache.get_or_build(
+        portfolio['export_key'], file_name,
+        lambda: EXPORT_BUILDERS[file_name](tensor.to_frame(), state_summary))
+
+def download_buttons(portfolio):
+    # Payloads are built only when a button is clicked; downloading does not rerun the script
+    cache = get_export_cache()
     st.download_button(
         label="📊 Download Portfolio Report (Excel)",
-        data=output.getvalue(),
-        file_name="Sunsure_ESG_Portfolio_Report.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        data=lambda: export_payload(cache, portfolio, PORTFOLIO_REPORT_NAME),
+        file_name=PORTFOLIO_REPORT_NAME,
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        on_click="ignore"
     )
     st.download_button(
         label="🗺️ Download State Analysis (CSV)",
-        data=state_summary.to_csv(index=False),
-        file_name="Sunsure_State_Analysis.csv",
-        mime="text/csv"
+        data=lambda: export_payload(cache, portfolio, STATE_ANALYSIS_NAME),
+        file_name=STATE_ANALYSIS_NAME,
+        mime="text/csv",
+        on_click="ignore"
     )
-    executive_summary = {
-        "Portfolio Sites": len(df),
-        "Total Capacity (MW)": df['Capacity_MW'].sum(),
-        "Total Water (Litres)": df['Water_Total'].sum(),
-        "Total Diesel (Litres)": df['Diesel_Total'].sum(),
-        "Total GHG Emissions (tCO2e)": df['GHG_Total'].sum()
-    }
-    exec_df = pd.DataFrame([executive_summary])
     st.download_button(
         label="📋 Download Executive Summary (CSV)",
-        data=exec_df.to_csv(index=False),
-        file_name="Sunsure_Executive_Summary.csv",
-        mime="text/csv"
+        data=lambda: export_payload(cache, portfolio, EXECUTIVE_SUMMARY_NAME),
+        file_name=EXECUTIVE_SUMMARY_NAME,
+        mime="text/csv",
+        on_click="ignore"
     )
 
+def render_portfolio_summary(aggregates):
+    totals = aggregates.totals()
+    st.subheader("Portfolio Executive Summary")
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.markdown(kpi_card_white("Portfolio Sites", totals['sites'], "Sites"), unsafe_allow_html=True)
+    with col2:
+        st.markdown(kpi_card_white("Total Capacity", f"{totals['capacity']:,.0f}", "MW"), unsafe_allow_html=True)
+    with col3:
+        st.markdown(kpi_card_white("Total Water", f"{totals['water']:,.0f}", "Litres"), unsafe_allow_html=True)
+    with col4:
+        st.markdown(kpi_card_white("Total Diesel", f"{totals['diesel']:,.0f}", "Litres"), unsafe_allow_html=True)
+    with col5:
+        st.markdown(kpi_card_white("Total GHG Emissions", f"{totals['ghg']:,.2f}", "tCO₂e"), unsafe_allow_html=True)
+    
+    st.subheader("State-wise Performance")
+    st.dataframe(aggregates.state_summary(), use_container_width=True, hide_index=True)
+
+def render_portfolio_dashboard(portfolio):
+    for level, message in portfolio['messages']:
+        getattr(st, level)(message)
+    aggregates = portfolio['aggregates']
+    render_portfolio_summary(aggregates)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("By Technology")
+        st.dataframe(aggregates.group_summary('technology'), use_container_width=True, hide_index=True)
+    with col2:
+        st.subheader("By Site Category")
+        st.dataframe(aggregates.group_summary('category', 'Category'), use_container_width=True, hide_index=True)
+    
+    st.subheader("Monthly GHG Emissions Trend")
+    st.plotly_chart(portfolio['figures']['monthly_ghg'], use_container_width=True)
+    
+    render_history_section()
+    
+    st.subheader("Export / Download Reports")
+    download_buttons(portfolio)
+
+HISTORY_GRAINS = {"Financial Year": 'fy', "Quarter": 'quarter', "Month": 'month'}
+
+@st.fragment
+def render_history_section():
+    # Reads the precomputed rollups of every stored reporting period; no facts are scanned
+    store = get_fact_store()
+    periods = [period for period in store.periods() if period]
+    if not periods:
+        return
+    st.subheader("Multi-Year GHG Emissions Trend")
+    col1, col2 = st.columns(2)
+    with col1:
+        grain = st.radio("Granularity", list(HISTORY_GRAINS), horizontal=True, key="history_grain")
+    with col2:
+        by_state = st.radio("View", ["Portfolio", "By State"], horizontal=True, key="history_view") == "By State"
+    
+    rollups = store.rollups(HISTORY_GRAINS[grain], 'state')
+    totals = rollups.groupby(['key', 'bucket'] if by_state else ['bucket'], as_index=False)['emissions_tco2e'].sum()
+    fig = px.line(totals, x='bucket', y='emissions_tco2e', color='key' if by_state else None, markers=True,
+                  labels={'bucket': grain, 'emissions_tco2e': 'GHG Emissions (tCO₂e)', 'key': 'State'},
+                  color_discrete_sequence=None if by_state else [SUNSURE_GREEN])
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"All stored sites, reporting periods {', '.join(periods)} "
+               "(Indian financial year, April-March)")
+
+def site_view(site_name):
+    # Built with the portfolio in set_portfolio(); navigating is one dict lookup
+    portfolio = st.session_state.get('portfolio')
+    return portfolio['site_views'].get(site_name) if portfolio else None
+
 def render_site_dashboard(site_name, site_category):
+    # Each section is a fragment: its buttons rerun that section only, not the page
+    render_site_header(site_name, site_category)
+    render_ghg_section(site_name, site_view(site_name))
+    render_esia_section(site_name)
+    render_risk_section()
+    render_approvals_section(site_name)
+    render_grievances_section()
+
+def render_site_header(site_name, site_category):
     st.markdown(f"""
     <div style="text-align:center; margin-bottom:2rem;">
         <h1 style="color: {SUNSURE_GREEN}; font-size: 2.5rem; font-weight: 800; margin-bottom: 0.5rem;">
@@ -404,37 +657,70 @@ def render_site_dashboard(site_name, site_category):
     # Back navigation
     col1, col2, col3 = st.columns([1, 2, 1])
     with col1:
-        if st.button("⬅️ Back to Sites", key="back_to_sites"):
-            st.session_state.page = 'site_selection'
-            st.session_state.selected_site = None
-            st.rerun()
-    
+        st.button("⬅️ Back to Sites", key="back_to_sites", on_click=go_to, args=('site_selection', site_category))
+
+SHORT_MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def site_emissions_figure(site_name, monthly_ghg):
+    return px.line(x=SHORT_MONTHS, y=list(monthly_ghg),
+                   title=f"Monthly GHG Emissions Trend - {site_name}",
+                   labels={'x': 'Month', 'y': 'GHG Emissions (tCO₂e)'},
+                   color_discrete_sequence=[SUNSURE_GREEN])
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def site_resources_figure(site_name, water, diesel):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=SHORT_MONTHS, y=list(water), name='Water (Litres)', line=dict(color='#1f77b4')))
+    fig.add_trace(go.Scatter(x=SHORT_MONTHS, y=list(diesel), name='Diesel (Litres)', yaxis='y2',
+                             line=dict(color=SUNSURE_RED)))
+    fig.update_layout(title=f"Monthly Resource Use - {site_name}",
+                      yaxis=dict(title='Water (Litres)'),
+                      yaxis2=dict(title='Diesel (Litres)', overlaying='y', side='right'))
+    return fig
+
+def render_ghg_section(site_name, view):
     # Section 1: GHG Data
     st.markdown('<div class="site-section">', unsafe_allow_html=True)
     st.markdown('<h3 class="section-header">🌍 GHG Data & Environmental Metrics</h3>', unsafe_allow_html=True)
     
-    # Demo GHG KPIs for the site
+    if view is None:
+        st.info(f"No GHG data loaded for {site_name}. Upload its workbook or open the stored portfolio on the main page.")
+        st.markdown('</div>', unsafe_allow_html=True)
+        return
+    
+    kpis, intensity = view['kpis'], view['intensity']
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.markdown(kpi_card_white("Scope 1 Emissions", "12.5", "tCO₂e"), unsafe_allow_html=True)
+        st.markdown(kpi_card_white("Scope 1 Emissions", f"{kpis['scope1']:,.2f}", "tCO₂e"), unsafe_allow_html=True)
     with col2:
-        st.markdown(kpi_card_white("Water Consumption", "45,000", "Litres"), unsafe_allow_html=True)
+        st.markdown(kpi_card_white("Water Consumption", f"{kpis['water']:,.0f}", "Litres"), unsafe_allow_html=True)
     with col3:
-        st.markdown(kpi_card_white("Diesel Usage", "5,200", "Litres"), unsafe_allow_html=True)
+        st.markdown(kpi_card_white("Diesel Usage", f"{kpis['diesel']:,.0f}", "Litres"), unsafe_allow_html=True)
     with col4:
-        st.markdown(kpi_card_white("Clean Energy Gen.", "8,500", "MWh"), unsafe_allow_html=True)
+        st.markdown(kpi_card_white("Total GHG Emissions", f"{kpis['ghg']:,.2f}", "tCO₂e"), unsafe_allow_html=True)
     
-    # Monthly trends (demo)
-    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    demo_emissions = [10, 8, 12, 15, 18, 20, 22, 19, 16, 14, 11, 9]
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.markdown(kpi_card_white("Capacity", f"{view['capacity']:,.0f}", "MW"), unsafe_allow_html=True)
+    with col2:
+        st.markdown(kpi_card_white("GHG Intensity", f"{intensity['ghg_per_mw']:,.3f}", "tCO₂e/MW"), unsafe_allow_html=True)
+    with col3:
+        st.markdown(kpi_card_white("Water Intensity", f"{intensity['water_per_mw']:,.0f}", "Litres/MW"), unsafe_allow_html=True)
+    with col4:
+        st.markdown(kpi_card_white("Diesel Intensity", f"{intensity['diesel_per_mw']:,.1f}", "Litres/MW"), unsafe_allow_html=True)
     
-    fig = px.line(x=months, y=demo_emissions, 
-                  title=f"Monthly GHG Emissions Trend - {site_name}",
-                  labels={'x': 'Month', 'y': 'GHG Emissions (tCO₂e)'},
-                  color_discrete_sequence=[SUNSURE_GREEN])
-    st.plotly_chart(fig, use_container_width=True)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(site_emissions_figure(site_name, tuple(view['monthly_ghg'])), use_container_width=True)
+    with col2:
+        st.plotly_chart(site_resources_figure(site_name, tuple(view['monthly']['water']),
+                                              tuple(view['monthly']['diesel'])), use_container_width=True)
+    st.caption(f"From {len(view['files'])} file(s): {', '.join(view['files'])}")
     st.markdown('</div>', unsafe_allow_html=True)
-    
+
+@st.fragment
+def render_esia_section(site_name):
     # Section 2: ESIA Study Status
     st.markdown('<div class="site-section">', unsafe_allow_html=True)
     st.markdown('<h3 class="section-header">📋 ESIA Study Status</h3>', unsafe_allow_html=True)
@@ -463,7 +749,9 @@ def render_site_dashboard(site_name, site_category):
         """, unsafe_allow_html=True)
     
     st.markdown('</div>', unsafe_allow_html=True)
-    
+
+@st.fragment
+def render_risk_section():
     # Section 3: E&S Risks Callout
     st.markdown('<div class="site-section">', unsafe_allow_html=True)
     st.markdown('<h3 class="section-header">⚠️ E&S Risks Callout</h3>', unsafe_allow_html=True)
@@ -532,30 +820,24 @@ def render_site_dashboard(site_name, site_category):
     with col3:
         st.metric("Low Risk Increase", "67%", delta="+8 risks", delta_color="inverse")
     
-    # Risk Trend Chart using proper DataFrame format
-    risk_months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun']
-    risk_trend = pd.DataFrame({
-        'Month': risk_months,
-        'High Risk': [3, 3, 2, 1, 0, 0],
-        'Medium Risk': [7, 6, 5, 4, 3, 2],
-        'Low Risk': [12, 13, 15, 17, 19, 20]
-    })
     if st.button("📑 View E&S Risk Register"):
         st.info("Here you can display or download the E&S Risk Register file, table, or link (functionality to be added).")
 
     st.markdown('</div>', unsafe_allow_html=True)
-    
+
+APPROVALS_DATA = [
+    {"Document": "Consent to Establish (CTE)", "Issue Date": "Jan 15, 2024", "Valid Until": "Jan 14, 2026", "Status": "Active"},
+    {"Document": "Consent to Operate (CTO)", "Issue Date": "Mar 22, 2024", "Valid Until": "Mar 21, 2027", "Status": "Active"},
+    {"Document": "Intimation Letter", "Issue Date": "Feb 08, 2024", "Valid Until": "N/A", "Status": "Acknowledged"}
+]
+
+@st.fragment
+def render_approvals_section(site_name):
     # Section 4: Regulatory Approvals
     st.markdown('<div class="site-section">', unsafe_allow_html=True)
     st.markdown('<h3 class="section-header">📜 Regulatory Approvals</h3>', unsafe_allow_html=True)
     
-    approvals_data = [
-        {"Document": "Consent to Establish (CTE)", "Issue Date": "Jan 15, 2024", "Valid Until": "Jan 14, 2026", "Status": "Active"},
-        {"Document": "Consent to Operate (CTO)", "Issue Date": "Mar 22, 2024", "Valid Until": "Mar 21, 2027", "Status": "Active"},
-        {"Document": "Intimation Letter", "Issue Date": "Feb 08, 2024", "Valid Until": "N/A", "Status": "Acknowledged"}
-    ]
-    
-    for approval in approvals_data:
+    for approval in APPROVALS_DATA:
         st.markdown(f"""
         <div class="approval-card">
             <div style="display: flex; justify-content: space-between; align-items: center;">
@@ -576,13 +858,9 @@ def render_site_dashboard(site_name, site_category):
         st.info("All regulatory certificates download would be initiated here")
     
     st.markdown('</div>', unsafe_allow_html=True)
-    
-    # Section 5: Grievances
-    st.markdown('<div class="site-section">', unsafe_allow_html=True)
-    st.markdown('<h3 class="section-header">📢 Grievances Management</h3>', unsafe_allow_html=True)
 
 # Define category data
-cat_grievances = [
+GRIEVANCE_CATEGORIES = [
     {
         "Category": "Employees",
         "Color": "#003865",
@@ -609,50 +887,55 @@ cat_grievances = [
     },
 ]
 
-# Calculate totals (NO CURLY BRACES HERE)
-total_grievances = sum(cat["Total"] for cat in cat_grievances)
-total_resolved = sum(cat["Resolved"] for cat in cat_grievances)
-total_pending = sum(cat["Pending"] for cat in cat_grievances)
-
-# Display overall summary
-st.markdown("<h4 style='margin-bottom:1rem;'>Overall Summary</h4>", unsafe_allow_html=True)
-s1, s2, s3 = st.columns(3)
-s1.markdown(f"""
-<div class='grievance-metric' style='background:#fff;box-shadow:0 2px 10px rgba(0,0,0,0.09);border-top:5px solid #003865;'>
-<h4 style='color:#003865;margin-bottom:0.5rem;'>Total Grievances</h4>
-<h2 style='color:#003865;margin:0;'>{total_grievances}</h2>
-</div>
-""", unsafe_allow_html=True)
-
-s2.markdown(f"""
-<div class='grievance-metric' style='background:#fff;box-shadow:0 2px 10px rgba(0,0,0,0.09);border-top:5px solid #198754;'>
-<h4 style='color:#198754;margin-bottom:0.5rem;'>Total Resolved</h4>
-<h2 style='color:#198754;margin:0;'>{total_resolved}</h2>
-</div>
-""", unsafe_allow_html=True)
-
-s3.markdown(f"""
-<div class='grievance-metric' style='background:#fff;box-shadow:0 2px 10px rgba(0,0,0,0.09);border-top:5px solid #fd7e14;'>
-<h4 style='color:#fd7e14;margin-bottom:0.5rem;'>Total Pending</h4>
-<h2 style='color:#fd7e14;margin:0;'>{total_pending}</h2>
-</div>
-""", unsafe_allow_html=True)
-
-# Display category-wise breakdown
-st.markdown("<h4 style='margin-top:2rem;margin-bottom:1.5rem;'>Category-wise Breakdown</h4>", unsafe_allow_html=True)
-cols = st.columns(3)
-for i, info in enumerate(cat_grievances):
-     cols[i].markdown(f"""
-     <div class='grievance-metric' style='background:#fff;box-shadow:0 2px 10px rgba(0,0,0,0.09);border-top:5px solid {info['Color']};margin-bottom:1rem;'>
-        <h3 style='color:{info['Color']};margin-bottom:0.5rem;'>{info['Category']}</h3>
-        <p style='margin:0.15rem 0;font-size:1.15rem;'><b>Total:</b> {info['Total']}</p>
-        <p style='margin:0.10rem 0;color:#198754;font-weight:600;'><b>Resolved:</b> {info['Resolved']}</p>
-        <p style='margin:0.10rem 0;color:#fd7e14;font-weight:600;'><b>Pending:</b> {info['Pending']}</p>
-        <p style='margin:0.18rem 0 0 0;'><b>Avg Time:</b> {info['AvgTime']}</p>
+def render_grievances_section():
+    # Section 5: Grievances
+    st.markdown('<div class="site-section">', unsafe_allow_html=True)
+    st.markdown('<h3 class="section-header">📢 Grievances Management</h3>', unsafe_allow_html=True)
+    
+    # Calculate totals (NO CURLY BRACES HERE)
+    total_grievances = sum(cat["Total"] for cat in GRIEVANCE_CATEGORIES)
+    total_resolved = sum(cat["Resolved"] for cat in GRIEVANCE_CATEGORIES)
+    total_pending = sum(cat["Pending"] for cat in GRIEVANCE_CATEGORIES)
+    
+    # Display overall summary
+    st.markdown("<h4 style='margin-bottom:1rem;'>Overall Summary</h4>", unsafe_allow_html=True)
+    s1, s2, s3 = st.columns(3)
+    s1.markdown(f"""
+    <div class='grievance-metric' style='background:#fff;box-shadow:0 2px 10px rgba(0,0,0,0.09);border-top:5px solid #003865;'>
+    <h4 style='color:#003865;margin-bottom:0.5rem;'>Total Grievances</h4>
+    <h2 style='color:#003865;margin:0;'>{total_grievances}</h2>
     </div>
     """, unsafe_allow_html=True)
 
-st.markdown('</div>', unsafe_allow_html=True)
+    s2.markdown(f"""
+    <div class='grievance-metric' style='background:#fff;box-shadow:0 2px 10px rgba(0,0,0,0.09);border-top:5px solid #198754;'>
+    <h4 style='color:#198754;margin-bottom:0.5rem;'>Total Resolved</h4>
+    <h2 style='color:#198754;margin:0;'>{total_resolved}</h2>
+    </div>
+    """, unsafe_allow_html=True)
+
+    s3.markdown(f"""
+    <div class='grievance-metric' style='background:#fff;box-shadow:0 2px 10px rgba(0,0,0,0.09);border-top:5px solid #fd7e14;'>
+    <h4 style='color:#fd7e14;margin-bottom:0.5rem;'>Total Pending</h4>
+    <h2 style='color:#fd7e14;margin:0;'>{total_pending}</h2>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Display category-wise breakdown
+    st.markdown("<h4 style='margin-top:2rem;margin-bottom:1.5rem;'>Category-wise Breakdown</h4>", unsafe_allow_html=True)
+    cols = st.columns(3)
+    for i, info in enumerate(GRIEVANCE_CATEGORIES):
+        cols[i].markdown(f"""
+        <div class='grievance-metric' style='background:#fff;box-shadow:0 2px 10px rgba(0,0,0,0.09);border-top:5px solid {info['Color']};margin-bottom:1rem;'>
+            <h3 style='color:{info['Color']};margin-bottom:0.5rem;'>{info['Category']}</h3>
+            <p style='margin:0.15rem 0;font-size:1.15rem;'><b>Total:</b> {info['Total']}</p>
+            <p style='margin:0.10rem 0;color:#198754;font-weight:600;'><b>Resolved:</b> {info['Resolved']}</p>
+            <p style='margin:0.10rem 0;color:#fd7e14;font-weight:600;'><b>Pending:</b> {info['Pending']}</p>
+            <p style='margin:0.18rem 0 0 0;'><b>Avg Time:</b> {info['AvgTime']}</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    st.markdown('</div>', unsafe_allow_html=True)
 
 
 def render_site_selection(category):
@@ -666,30 +949,24 @@ def render_site_selection(category):
     """, unsafe_allow_html=True)
     
     # Back button
-    if st.button("⬅️ Back to Main Menu", key="back_to_main"):
-        st.session_state.page = 'main'
-        st.session_state.site_category = None
-        st.rerun()
+    st.button("⬅️ Back to Main Menu", key="back_to_main", on_click=go_to, args=('main',))
     
     # Site buttons in a grid
     cols = st.columns(4)
     for i, site in enumerate(sites):
         with cols[i % 4]:
-            if st.button(site, key=f"site_{site}", help=f"View {site} dashboard"):
-                st.session_state.selected_site = site
-                st.session_state.page = 'site_dashboard'
-                st.rerun()
+            st.button(site, key=f"site_{site}", help=f"View {site} dashboard",
+                      on_click=go_to, args=('site_dashboard', category, site))
 
 def main():
     # Main page - Site category selection
     if st.session_state.page == 'main':
         # Logo
-        try:
-            logo = Image.open("Sunsure-Energy_Logo-with-tagline.png")
+        if 'logo' in ASSETS:
             st.markdown('<div style="text-align: center;">', unsafe_allow_html=True)
-            st.image(logo, width=320)
+            st.image(ASSETS['logo'].data, width=320)
             st.markdown('</div>', unsafe_allow_html=True)
-        except Exception:
+        else:
             st.warning("Logo image not found or unable to display.")
         
         # Welcome section
@@ -734,16 +1011,12 @@ def main():
         with col2:
             col_a, col_b = st.columns(2)
             with col_a:
-                if st.button("🔧 O&M Sites", key="om_sites", help="Operations & Maintenance Sites"):
-                    st.session_state.site_category = "O&M Sites"
-                    st.session_state.page = 'site_selection'
-                    st.rerun()
+                st.button("🔧 O&M Sites", key="om_sites", help="Operations & Maintenance Sites",
+                          on_click=go_to, args=('site_selection', "O&M Sites"))
             
             with col_b:
-                if st.button("🏗️ Construction Sites", key="construction_sites", help="Under Construction Sites"):
-                    st.session_state.site_category = "Construction Sites"
-                    st.session_state.page = 'site_selection'
-                    st.rerun()
+                st.button("🏗️ Construction Sites", key="construction_sites", help="Under Construction Sites",
+                          on_click=go_to, args=('site_selection', "Construction Sites"))
         
         # Portfolio dashboard section (if files uploaded)
         if uploaded_files:
@@ -755,42 +1028,29 @@ def main():
             dashboard_trigger = st.button("🚀 Generate Portfolio Dashboard", key="gen_button")
             st.markdown('</div>', unsafe_allow_html=True)
             
-            if dashboard_trigger:
-                # Process files and show portfolio dashboard
-                all_site_kpis = []
-                for file in uploaded_files:
-                    site_dict = process_excel_file(file, file.name.replace('.xlsx','').replace('.xls',''))
-                    if site_dict:
-                        all_site_kpis.append(site_dict)
-                
-                if all_site_kpis:
-                    df = pd.DataFrame(all_site_kpis)
-                    
-                    st.subheader("Portfolio Executive Summary")
-                    col1, col2, col3, col4, col5 = st.columns(5)
-                    with col1:
-                        st.markdown(kpi_card_white("Portfolio Sites", len(df), "Sites"), unsafe_allow_html=True)
-                    with col2:
-                        st.markdown(kpi_card_white("Total Capacity", f"{df['Capacity_MW'].sum():,.0f}", "MW"), unsafe_allow_html=True)
-                    with col3:
-                        st.markdown(kpi_card_white("Total Water", f"{df['Water_Total'].sum():,.0f}", "Litres"), unsafe_allow_html=True)
-                    with col4:
-                        st.markdown(kpi_card_white("Total Diesel", f"{df['Diesel_Total'].sum():,.0f}", "Litres"), unsafe_allow_html=True)
-                    with col5:
-                        st.markdown(kpi_card_white("Total GHG Emissions", f"{df['GHG_Total'].sum():,.2f}", "tCO₂e"), unsafe_allow_html=True)
-                    
-                    st.subheader("State-wise Performance")
-                    state_summary = df.groupby('State').agg({
-                        'Capacity_MW': 'sum',
-                        'Water_Total': 'sum',
-                        'Diesel_Total': 'sum',
-                        'GHG_Total': 'sum',
-                        'Site_Name': 'count'
-                    }).reset_index().rename(columns={'Site_Name': 'Num_Sites'})
-                    st.dataframe(state_summary, use_container_width=True, hide_index=True)
-                    
-                    st.subheader("Export / Download Reports")
-                    download_buttons(df, state_summary)
+            if dashboard_trigger and 'ingest' not in st.session_state:
+                # Parse new or changed files in the background; results render as they arrive
+                start_portfolio_ingest(uploaded_files, ingest_workers, incremental_ingest,
+                                       profile_enabled, profile_memory)
+            
+            # The last result is only shown while the same set of files is uploaded
+            portfolio = current_portfolio()
+            if 'ingest' in st.session_state:
+                render_ingest_progress()
+            elif portfolio and portfolio['sites'] and portfolio['files'] == upload_key(uploaded_files):
+                render_portfolio_dashboard(portfolio)
+        
+        # Portfolio from previous runs, served from the fact store without re-parsing
+        else:
+            store = get_fact_store()
+            stored_sites = store.site_names()
+            if stored_sites:
+                st.markdown('<hr style="margin: 3rem 0;">', unsafe_allow_html=True)
+                st.info(f"📂 {len(stored_sites)} site(s) available from previous uploads.")
+                st.button("📂 Open Stored Portfolio", key="stored_button", on_click=open_stored_portfolio)
+                portfolio = current_portfolio()
+                if portfolio and portfolio['files'] is None:
+                    render_portfolio_dashboard(portfolio)
     
     # Site selection page
     elif st.session_state.page == 'site_selection':
@@ -802,6 +1062,7 @@ def main():
 
 if __name__ == "__main__":
     main()
+    show_profile(profile_output, *st.session_state.get('last_profile', (None, None)))
 
 
 
@@ -2,6 +2,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import os
+from esg_schema import frame_schema
 
 def process_single_site_file(excel_file_path):
     excel_data = pd.read_excel(excel_file_path, sheet_name=None)
@@ -18,10 +19,11 @@ def extract_ghg_data(excel_data):
     return main_sheet
 
 def calculate_kpis(data_sheet):
-    # Simplified diesel extraction from Project 1 sheet format
-    diesel_rows = data_sheet[data_sheet.iloc[:,2].astype(str).str.contains('Diesel', na=False)]
+    # Simplified diesel extraction; description and month columns come from the sheet's header row
+    schema = frame_schema(data_sheet)
+    diesel_rows = data_sheet[data_sheet.iloc[:,schema.description_col].astype(str).str.contains('Diesel', na=False)]
     diesel_total = 0
-    for col in data_sheet.columns[5:17]:
+    for col in data_sheet.columns[[c for c in schema.month_cols if c < data_sheet.shape[1]]]:
         values = diesel_rows[col].fillna(0)
         for val in values:
             val_str = str(val)
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from esg_aggregates import UNASSIGNED, RunningAggregates
+from esg_factors import load_factors
+from esg_portfolio import PortfolioTensor
+from esg_records import SunsureKPIRecord
+
+SITES = [('a', 'Rajasthan', 100.0, 'Solar'), ('b', 'Maharashtra', 50.0, 'Solar'),
+         ('c', 'Rajasthan', 20.0, 'Wind'), ('d', 'Gujarat', 0.0, 'Solar')]
+
+
+def record(site_name, state, capacity, technology, scale=1.0):
+    monthly = np.arange(48, dtype=float).reshape(4, 12) * scale
+    return SunsureKPIRecord(site_name, state, capacity, technology, monthly, [0.0, 0.0, 0.0], '2025')
+
+
+def tensor(records):
+    return PortfolioTensor.from_records(records, load_factors())
+
+
+@pytest.fixture
+def records():
+    return [record(*site, scale=i + 1) for i, site in enumerate(SITES)]
+
+
+def assert_matches(aggregates, portfolio):
+    pd.testing.assert_frame_equal(aggregates.state_summary(), portfolio.state_summary())
+    totals, expected = aggregates.totals(), portfolio.portfolio_totals()
+    for field in expected:
+        assert totals[field] == pytest.approx(expected[field])
+
+
+def test_from_tensor(records):
+    portfolio = tensor(records)
+    assert_matches(RunningAggregates.from_tensor(portfolio), portfolio)
+
+
+def test_add_site(records):
+    aggregates = RunningAggregates.from_tensor(tensor(records[:3]))
+    portfolio = tensor(records)
+    aggregates.set_tensor_sites(portfolio, ['d'])
+    assert len(aggregates) == 4
+    assert_matches(aggregates, portfolio)
+
+
+def test_replace_site(records):
+    aggregates = RunningAggregates.from_tensor(tensor(records))
+    records[1] = record('b', 'Gujarat', 60.0, 'Solar', scale=10.0)
+    portfolio = tensor(records)
+    aggregates.sync(portfolio, ['b'])
+    assert_matches(aggregates, portfolio)
+    assert 'Maharashtra' not in aggregates.groups['state']
+
+
+def test_remove_sites(records):
+    aggregates = RunningAggregates.from_tensor(tensor(records))
+    portfolio = tensor([records[0], records[2]])
+    aggregates.sync(portfolio, [])
+    assert_matches(aggregates, portfolio)
+    assert not aggregates.remove_site('b')
+    for name in ('a', 'c'):
+        assert aggregates.remove_site(name)
+    assert len(aggregates.state_summary()) == 0
+    assert aggregates.totals()['ghg'] == 0.0
+
+
+def test_set_record_and_intensities(records):
+    aggregates = RunningAggregates()
+    for site in records:
+        aggregates.set_record(site, category='Utility' if site.capacity >= 50 else '')
+    totals = aggregates.totals()
+    assert totals['water'] == pytest.approx(sum(float(site.monthly[0].sum()) for site in records))
+    assert totals['water_per_mw'] == pytest.approx(totals['water'] / 170.0)
+
+    categories = aggregates.group_summary('category', 'Site Category')
+    assert categories['Site Category'].tolist() == [UNASSIGNED, 'Utility']
+    assert categories['Num_Sites'].tolist() == [2, 2]
+    technologies = aggregates.group_summary('technology')
+    assert technologies.set_index('Technology').loc['Solar', 'Capacity_MW'] == 150.0
+    # A group without capacity has no per-MW figure
+    assert np.isnan(aggregates.group_summary('state').set_index('State').loc['Gujarat', 'GHG_per_MW'])
@@ -0,0 +1,10 @@
+from esg_batch import read_jobs
+
+
+def test_jobs_take_site_master_names(tmp_path):
+    listed = tmp_path / '7.GHG_Data_July-2025_100MW-Solar-project-Solapur-M.xlsx'
+    unlisted = tmp_path / 'site_c.xlsx'
+    for path in (listed, unlisted):
+        path.write_bytes(b'')
+    jobs = read_jobs([str(listed), str(unlisted)])
+    assert [site for _, _, site in jobs] == ['Solapur', 'site_c']
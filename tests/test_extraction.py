@@ -0,0 +1,67 @@
+import io
+import math
+import re
+import zipfile
+
+import pandas as pd
+from openpyxl import Workbook
+
+import esg_extraction
+from esg_extraction import (MONTHS, PORTAL_RESOURCES, SUNSURE_RESOURCES, extract_resource_monthly,
+                            portal_kpis_from_monthly, read_main_sheet, stream_resource_monthly,
+                            stream_sunsure_site_kpis, sunsure_site_kpis)
+
+
+def understated_dimensions(data):
+    """Workbook bytes whose sheet claims to span only A1:C2"""
+    source, output = zipfile.ZipFile(io.BytesIO(data)), io.BytesIO()
+    with zipfile.ZipFile(output, 'w') as archive:
+        for name in source.namelist():
+            member = source.read(name)
+            if name.startswith('xl/worksheets/'):
+                member = re.sub(rb'<dimension ref="[^"]*" ?/>', b'<dimension ref="A1:C2"/>', member)
+            archive.writestr(name, member)
+    return output.getvalue()
+
+
+def test_rows_beyond_a_wrong_sheet_dimension_are_read():
+    book = Workbook()
+    sheet = book.active
+    sheet.title = 'Project 1'
+    sheet.append(['GHG Data'])
+    for i in range(5):
+        sheet.append([None, i, 'Water supply', None, 'L', *[10] * 12])
+    buffer = io.BytesIO()
+    book.save(buffer)
+    data = understated_dimensions(buffer.getvalue())
+
+    frame = read_main_sheet(io.BytesIO(data))
+    assert frame.shape == (5, 17)
+    assert extract_resource_monthly(frame, SUNSURE_RESOURCES).loc['water'].sum() == 600.0
+    assert stream_resource_monthly(io.BytesIO(data), SUNSURE_RESOURCES).loc['water'].sum() == 600.0
+
+
+def test_portal_intensities_without_capacity_are_nan(monkeypatch):
+    monthly = pd.DataFrame(1.0, index=[name for name, _ in PORTAL_RESOURCES], columns=MONTHS)
+    monkeypatch.setattr(esg_extraction, 'site_attributes', lambda site_name: ('Rajasthan', 0.0, 'Solar'))
+    record = portal_kpis_from_monthly(monthly, 'Pinahat')
+    assert record['Site_Capacity_MW'] == 0.0
+    assert record['Water_Consumption_Liters'] == 12.0
+    for field in ('Emission_Intensity_tCO2e_per_MW', 'Water_Intensity_L_per_MW', 'Fuel_Intensity_L_per_MW'):
+        assert math.isnan(record[field])
+
+
+def test_sheet_and_streaming_reads_find_the_same_period():
+    book = Workbook(write_only=True)
+    sheet = book.create_sheet('Project 1')
+    sheet.append(['GHG Data'])
+    sheet.append([None, None, 'Reporting month: August 2024'])
+    sheet.append([None, 1, 'Water supply', None, 'L', *[10] * 12])
+    buffer = io.BytesIO()
+    book.save(buffer)
+    data = buffer.getvalue()
+
+    framed = sunsure_site_kpis(read_main_sheet(io.BytesIO(data)), 'Pinahat.xlsx', 'Pinahat')
+    streamed = stream_sunsure_site_kpis(io.BytesIO(data), 'Pinahat.xlsx', 'Pinahat')
+    assert framed.period == streamed.period == '2024'
+    assert stream_sunsure_site_kpis(io.BytesIO(data), 'GHG_Data_July-2025.xlsx', 'Pinahat').period == '2025'
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from esg_periods import detect_period, fy_label, period_buckets, quarter_label, sheet_period
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('7.GHG_Data_July-2025_100MW-Solar-project-Solapur-M.xlsx', (2025, 7)),
+    ('Jul 2025', (2025, 7)),
+    ('july_25', (2025, 7)),
+    ('Sept-24', (2024, 9)),
+    ('September 2024', (2024, 9)),
+    ('2025-07', (2025, 7)),
+    ('2025_7', (2025, 7)),
+])
+def test_detect_period(text, expected):
+    assert detect_period(text) == expected
+
+
+@pytest.mark.parametrize('text', ['Mayurbhanj 50', 'Marwar-24', 'Decision 2024', 'Mar 50', 'Block 1987-05', 'Solapur'])
+def test_detect_period_ignores_other_words_and_numbers(text):
+    assert detect_period(text) is None
+
+
+def test_sheet_period_skips_blank_dates():
+    sheet = pd.DataFrame([[pd.NaT, 'Site: Marwar-24'], [None, 'Data for May 2025'], [datetime(2024, 1, 1), None]])
+    assert sheet_period(sheet) == (2025, 5)
+
+
+@pytest.mark.parametrize('year, month, fy, quarter', [
+    (2025, 1, 'FY2024-25', 'FY2024-25 Q4'),
+    (2025, 3, 'FY2024-25', 'FY2024-25 Q4'),
+    (2025, 4, 'FY2025-26', 'FY2025-26 Q1'),
+    (2025, 7, 'FY2025-26', 'FY2025-26 Q2'),
+    (2025, 12, 'FY2025-26', 'FY2025-26 Q3'),
+    (1999, 12, 'FY1999-00', 'FY1999-00 Q3'),
+])
+def test_financial_year_buckets(year, month, fy, quarter):
+    assert fy_label(year, month) == fy
+    assert quarter_label(year, month) == quarter
+
+
+def test_period_buckets_split_a_calendar_year_across_financial_years():
+    buckets = period_buckets(['2025', '', '2025'])
+    assert list(buckets['month_bucket']) == [f"2025-{m:02d}" for m in range(1, 13)]
+    assert buckets.groupby('fy').size().to_dict() == {'FY2024-25': 3, 'FY2025-26': 9}
+    assert buckets.groupby('quarter').size().to_dict() == {
+        'FY2024-25 Q4': 3, 'FY2025-26 Q1': 3, 'FY2025-26 Q2': 3, 'FY2025-26 Q3': 3}
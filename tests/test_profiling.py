@@ -0,0 +1,55 @@
+import threading
+import tracemalloc
+
+from esg_profiling import StageProfile, activated, stage
+
+
+def test_stage_is_a_no_op_without_an_active_profile():
+    profile = StageProfile()
+    with activated(None), stage('plan'):
+        pass
+    with activated(profile), stage('plan'):
+        pass
+    assert [entry['stage'] for entry in profile.entries] == ['plan']
+
+
+def test_memory_is_traced_while_any_profile_traces():
+    outer, inner = StageProfile(trace_memory=True), StageProfile(trace_memory=True)
+    with outer.activate():
+        with inner.activate(), stage('extract'):
+            bytearray(2_000_000)
+        assert tracemalloc.is_tracing()
+        with stage('write'):
+            pass
+    assert not tracemalloc.is_tracing()
+    assert inner.entries[0]['peak_mb'] >= 2.0
+    assert outer.entries[0]['peak_mb'] is not None
+
+
+def test_no_peak_when_another_thread_traces():
+    profile, other = StageProfile(trace_memory=True), StageProfile(trace_memory=True)
+    started, release = threading.Event(), threading.Event()
+
+    def trace_elsewhere():
+        with other.activate():
+            started.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=trace_elsewhere)
+    with profile.activate():
+        with stage('before'):
+            pass
+        thread.start()
+        started.wait(5)
+        with stage('during'):
+            pass
+        release.set()
+        thread.join(5)
+        # Tracing keeps running for this profile after the other one stops
+        assert tracemalloc.is_tracing()
+        with stage('after'):
+            pass
+    assert not tracemalloc.is_tracing()
+    peaks = {entry['stage']: entry['peak_mb'] for entry in profile.entries}
+    assert peaks['before'] is not None and peaks['after'] is not None
+    assert peaks['during'] is None
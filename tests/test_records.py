@@ -0,0 +1,28 @@
+import numpy as np
+
+from esg_records import PORTAL_VALUES, PortalKPIRecord, SunsureKPIRecord, portal_frame, sunsure_arrays
+
+
+def test_sunsure_record_reads_like_a_dict():
+    monthly = np.arange(48, dtype=float).reshape(4, 12)
+    record = SunsureKPIRecord('Solapur', 'Maharashtra', 100.0, 'Solar', monthly, [1.0, 2.0, 3.5], '2025')
+    assert list(record)[:4] == ['Site_Name', 'State', 'Capacity_MW', 'Technology']
+    assert record['Water_Total'] == float(monthly[0].sum())
+    assert record['Cement_Monthly'] == monthly[3].tolist()
+    assert record['GHG_Total_Scope3'] == 3.5
+    assert record['GHG_Total'] == 6.5
+    assert record.get('Missing', 0) == 0
+    assert record.to_dict()['Period'] == '2025'
+
+    activity, scopes = sunsure_arrays([record, record])
+    assert activity.shape == (2, 4, 12)
+    np.testing.assert_array_equal(scopes[1], [1.0, 2.0, 3.5])
+
+
+def test_portal_records_stack_into_a_frame():
+    records = [PortalKPIRecord('a', '2025-07-01', np.arange(len(PORTAL_VALUES))),
+               PortalKPIRecord.missing('b', '2025-07-01')]
+    frame = portal_frame(records)
+    assert list(frame.columns) == ['Site_Name', 'Report_Date', *PORTAL_VALUES]
+    assert frame.loc[0, 'Site_Capacity_MW'] == records[0]['Site_Capacity_MW'] == 7.0
+    assert frame.loc[1, PORTAL_VALUES[0]] != frame.loc[1, PORTAL_VALUES[0]]
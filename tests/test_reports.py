@@ -0,0 +1,69 @@
+import gc
+import io
+import os
+import threading
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from esg_records import SunsureKPIRecord
+from esg_reports import ExportCache, excel_workbook, report_bundle
+
+
+def test_export_cache_builds_each_payload_once():
+    cache, started, release, calls = ExportCache(), threading.Event(), threading.Event(), []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return b'report'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_build('k', 'a.xlsx', slow)))
+               for _ in range(3)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    # Other payloads are not held up by the one being built
+    assert cache.get_or_build('k', 'b.csv', lambda: b'csv') == b'csv'
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == [b'report'] * 3
+    assert len(calls) == 1
+    assert cache.get_or_build('k', 'a.xlsx', slow) == b'report'
+
+
+def test_export_cache_does_not_keep_failed_builds():
+    cache = ExportCache()
+
+    def fail():
+        raise ValueError('no data')
+
+    with pytest.raises(ValueError):
+        cache.get_or_build('k', 'a.xlsx', fail)
+    assert cache.get_or_build('k', 'a.xlsx', lambda: b'report') == b'report'
+
+
+def test_workbook_writes_nan_and_inf_as_blanks():
+    frame = pd.DataFrame({'Site_Name': ['a', 'b', 'c'], 'GHG_per_MW': [1.5, np.inf, np.nan]})
+    sheet = load_workbook(io.BytesIO(excel_workbook({'KPIs': frame}))).active
+    assert [row[1] for row in sheet.iter_rows(min_row=2, values_only=True)] == [1.5, None, None]
+
+
+def test_report_bundle_stays_on_disk_until_released():
+    records = [SunsureKPIRecord(name, 'Rajasthan', 10.0, 'Solar', np.ones((4, 12)), [1.0, 2.0, 3.0], '2025')
+               for name in ('a', 'b/c', 'a')]
+    bundle = report_bundle('Portfolio.xlsx', {'Portfolio_KPIs': pd.DataFrame({'Site_Name': ['a', 'b/c', 'a']})}, records)
+    assert os.path.getsize(bundle.path) == bundle.size == len(bundle.read())
+    with zipfile.ZipFile(bundle.open()) as archive:
+        assert archive.namelist() == ['Portfolio.xlsx', 'sites/a.xlsx', 'sites/b_c.xlsx', 'sites/a_2.xlsx']
+    path = bundle.path
+    del bundle
+    gc.collect()
+    assert not os.path.exists(path)
@@ -0,0 +1,98 @@
+import io
+from datetime import datetime
+
+import pytest
+from openpyxl import Workbook
+
+from esg_extraction import SUNSURE_RESOURCES, extract_resource_monthly, read_main_sheet, stream_resource_monthly
+from esg_schema import DEFAULT_SCHEMA, SchemaCache, TemplateSchema, detect_schema, header_layout, template_schema
+
+JAN_DEC = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+APR_MAR = JAN_DEC[3:] + JAN_DEC[:3]
+TITLE = ('GHG Data - Solapur',)
+BANNER = ('S.No', 'Category', 'Site', 'Unit', 'Owner', 'Q1', 'Q1', 'Q1', 'Q2', 'Q2', 'Q2', 'Q3', 'Q3', 'Q3', 'Q4', 'Q4', 'Q4')
+
+
+def header(months, description='Description', unit='Unit'):
+    return (None, 'S.No', description, None, unit, *months)
+
+
+def test_text_month_orders_get_their_own_schema():
+    calendar = template_schema([TITLE, header(JAN_DEC)])
+    financial = template_schema([TITLE, header(APR_MAR)])
+    assert calendar == TemplateSchema(1, 2, 4, tuple(range(5, 17)))
+    assert financial == TemplateSchema(1, 2, 4, (14, 15, 16, 5, 6, 7, 8, 9, 10, 11, 12, 13))
+
+
+def test_label_columns_change_the_fingerprint():
+    swapped = header(JAN_DEC, description='Unit', unit='Description')
+    assert header_layout([TITLE, header(JAN_DEC)])[1] != header_layout([TITLE, swapped])[1]
+    assert template_schema([TITLE, swapped]).description_col == 4
+    assert template_schema([TITLE, swapped]).unit_col == 2
+
+
+def test_date_headers_and_long_month_names():
+    dates = [datetime(2025, month, 1) for month in range(1, 13)]
+    assert detect_schema([header(dates)]).month_cols == tuple(range(5, 17))
+    names = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'Sept', 'October',
+             'November', 'December']
+    assert detect_schema([header(names)]).month_cols == tuple(range(5, 17))
+
+
+def test_banner_row_above_the_header():
+    rows = [TITLE, BANNER, header(APR_MAR), (None, 1, 'Water', None, 'L', *range(12))]
+    block, _ = header_layout(rows)
+    assert len(block) == 3
+    assert template_schema(rows).header_row == 2
+
+
+def test_sheet_without_header_falls_back_to_default():
+    rows = [TITLE] + [(None, i, 'Water', None, 'L', *range(12)) for i in range(40)]
+    assert template_schema(rows) == DEFAULT_SCHEMA
+
+
+def test_schema_cache_detects_once_per_layout():
+    cache = SchemaCache()
+    first = [TITLE, header(JAN_DEC), (None, 1, 'Water', None, 'L', *range(12))]
+    second = [('GHG Data - Pinahat',), header(JAN_DEC), (None, 1, 'Diesel', None, 'L', *range(1, 13))]
+    assert cache.schema(first) == cache.schema(second)
+    cache.schema([TITLE, header(APR_MAR)])
+    assert (cache.hits, cache.misses, len(cache)) == (1, 2, 2)
+
+
+def test_schema_cache_evicts_least_recently_used():
+    cache = SchemaCache(max_entries=2)
+    layouts = [[TITLE, header(JAN_DEC)], [TITLE, header(APR_MAR)], [BANNER, header(JAN_DEC)]]
+    for rows in layouts:
+        cache.schema(rows)
+    assert len(cache) == 2
+    cache.schema(layouts[0])
+    assert cache.misses == 4
+
+
+def workbook(months, offset=0):
+    """Workbook bytes with a title, banner and month header, and water/diesel rows valued by calendar month"""
+    book = Workbook(write_only=True)
+    sheet = book.create_sheet('Project 1')
+    pad = (None,) * offset
+    sheet.append(TITLE)
+    sheet.append(pad + BANNER)
+    sheet.append(pad + header(months))
+    numbers = [JAN_DEC.index(month) + 1 for month in months]
+    sheet.append(pad + (None, 1, 'Water supply', None, 'L', *(f"{n * 100} L" for n in numbers)))
+    sheet.append(pad + (None, 2, 'Diesel', None, 'L', *numbers))
+    buffer = io.BytesIO()
+    book.save(buffer)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('months, offset', [(JAN_DEC, 0), (APR_MAR, 0), (APR_MAR, 2)])
+def test_sheet_and_streaming_reads_follow_the_header(months, offset):
+    data = workbook(months, offset)
+    frame = read_main_sheet(io.BytesIO(data))
+    assert frame.attrs['schema'].month_cols[0] == offset + 5 + months.index('Jan')
+    monthly = extract_resource_monthly(frame, SUNSURE_RESOURCES)
+    streamed = stream_resource_monthly(io.BytesIO(data), SUNSURE_RESOURCES)
+    assert monthly.loc['water'].tolist() == [n * 100.0 for n in range(1, 13)]
+    assert monthly.loc['diesel'].tolist() == [float(n) for n in range(1, 13)]
+    assert streamed.equals(monthly)
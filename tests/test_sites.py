@@ -0,0 +1,20 @@
+import pytest
+
+from esg_sites import guess_attributes, identify_state
+
+
+@pytest.mark.parametrize('file_name, state', [
+    ('7.GHG_Data_July-2025_100MW-Solar-project-Solapur-M.xlsx', 'Maharashtra'),
+    ('b_wind_20MW_rajasthan.xlsx', 'Rajasthan'),
+    ('Tamil Nadu Wind.xlsx', 'Tamil Nadu'),
+    ('PailaniSolar.xlsx', 'Uttar Pradesh'),
+    ('GHGData_Rajasthan50MW.xlsx', 'Rajasthan'),
+    ('TamilNadu_20MW.xlsx', 'Tamil Nadu'),
+    ('site_c.xlsx', 'Unknown'),
+])
+def test_identify_state(file_name, state):
+    assert identify_state(file_name) == state
+
+
+def test_guess_attributes_from_a_run_together_name():
+    assert guess_attributes('PailaniSolar20MW.xlsx') == ('Uttar Pradesh', 20, 'Solar')
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from esg_factors import load_factors
+from esg_portfolio import PortfolioTensor
+from esg_records import SunsureKPIRecord
+from esg_store import FactStore
+
+SITES = [('a', 'Rajasthan', 100.0, 'Solar'), ('b', 'Maharashtra', 50.0, 'Solar'), ('c', 'Rajasthan', 20.0, 'Wind')]
+
+
+def record(site_name, state, capacity, technology, scale=1.0, period='2025'):
+    monthly = np.arange(1, 49, dtype=float).reshape(4, 12) * scale
+    return SunsureKPIRecord(site_name, state, capacity, technology, monthly, [0.0, 0.0, 0.0], period)
+
+
+@pytest.fixture
+def factors():
+    return load_factors()
+
+
+@pytest.fixture
+def store(tmp_path, factors):
+    store = FactStore(str(tmp_path / 'store.db'))
+    store.write_records([record(*site, scale=i + 1) for i, site in enumerate(SITES)], factors=factors)
+    return store
+
+
+def test_records_round_trip(store, factors):
+    expected = PortfolioTensor.from_records([record(*site, scale=i + 1) for i, site in enumerate(SITES)], factors)
+    loaded = store.portfolio_tensor(['a', 'b', 'c'])
+    assert list(loaded.site_names) == ['a', 'b', 'c']
+    np.testing.assert_allclose(loaded.activity, expected.activity)
+    np.testing.assert_allclose(loaded.emissions, expected.emissions)
+    np.testing.assert_array_equal(loaded.scopes, expected.scopes)
+    np.testing.assert_array_equal(loaded.capacity, [100.0, 50.0, 20.0])
+    frame = store.portfolio_frame()
+    assert frame['Water_Total'].tolist() == pytest.approx([78.0, 156.0, 234.0])
+
+
+def test_rollups_sum_to_the_facts(store):
+    fy = store.rollups('fy', 'state')
+    water = fy[fy['resource'] == 'water'].groupby('key')['activity'].sum()
+    assert water.to_dict() == pytest.approx({'Maharashtra': 156.0, 'Rajasthan': 78.0 + 234.0})
+    # January-March 2025 falls in FY2024-25, April-December in FY2025-26
+    site = store.rollups('fy', 'site', keys=['a'])
+    water = site[site['resource'] == 'water'].set_index('bucket')['activity']
+    assert water.to_dict() == pytest.approx({'FY2024-25': 6.0, 'FY2025-26': 72.0})
+    quarters = store.rollups('quarter', 'site', keys=['a'])
+    assert set(quarters['bucket']) == {'FY2024-25 Q4', 'FY2025-26 Q1', 'FY2025-26 Q2', 'FY2025-26 Q3'}
+
+
+def test_snapshots_replace_their_own_period(store, factors):
+    store.write_records([record('a', 'Rajasthan', 100.0, 'Solar', scale=2.0),
+                         record('a', 'Rajasthan', 100.0, 'Solar', scale=5.0, period='2024')], factors=factors)
+    assert store.periods() == ['2024', '2025']
+    assert store.portfolio_frame(['a'])['Water_Total'].tolist() == pytest.approx([156.0])
+    assert store.portfolio_frame(['a'], period='2024')['Water_Total'].tolist() == pytest.approx([390.0])
+    assert store.site_names('2024') == ['a']
+
+
+def test_refresh_portfolio_reads_only_changed_sites(store, factors):
+    previous = store.portfolio_tensor(['a', 'b'])
+    store.write_records([record('b', 'Gujarat', 50.0, 'Solar', scale=7.0)], factors=factors)
+    refreshed = store.refresh_portfolio(previous, ['b', 'c'], ['b'])
+    assert refreshed.fingerprint() == store.portfolio_tensor(['b', 'c']).fingerprint()
+    assert list(refreshed.state_labels) == ['Gujarat', 'Rajasthan']
+
+
+def test_one_write_with_two_snapshots_of_a_site_keeps_the_last(store, factors):
+    store.write_records([record('a', 'Rajasthan', 100.0, 'Solar', scale=2.0),
+                         record('a', 'Rajasthan', 100.0, 'Solar', scale=3.0),
+                         record('d', 'Gujarat', 10.0, 'Solar', period='')], period='2025', factors=factors)
+    assert store.portfolio_frame(['a'])['Water_Total'].tolist() == pytest.approx([234.0])
+    assert store.portfolio_frame(['d'])['Water_Total'].tolist() == pytest.approx([78.0])